@@ -0,0 +1,80 @@
+from collections.abc import Callable
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+
+from post_history import text_digest
+from utils import get_logger
+
+
+logger = get_logger(__name__)
+
+
+class CandidatePrefetcher:
+    """Keeps up to ``in_flight`` tweet candidates generating in the background.
+
+    Each candidate is generated with its own seed (``first_seed``, ``first_seed + 1``,
+    ...), so they differ even though generation is seeded. ``next`` hands out the first
+    candidate to finish and immediately starts a replacement, so by the time the user
+    has read one candidate the next is usually ready. Candidates identical to one
+    already shown are rejected; ``failures`` counts how many candidates in a row were
+    failed or rejected. Only the first candidate may come from the response cache;
+    the rest are retries and always go to the model. ``close`` drops everything
+    still queued.
+    """
+
+    def __init__(self, generate: Callable[..., str | None], in_flight: int, first_seed: int) -> None:
+        self.generate = generate
+        self.in_flight = max(1, in_flight)
+        self.first_seed = first_seed
+        self._next_seed = first_seed
+        self._executor = ThreadPoolExecutor(max_workers=self.in_flight, thread_name_prefix="candidate")
+        self._pending: set[Future] = set()
+        self._shown: set[str] = set()
+        self.failures = 0
+
+    def __enter__(self) -> "CandidatePrefetcher":  # noqa: PYI034
+        self._top_up()
+        return self
+
+    def __exit__(self, *_exc: object) -> None:
+        self.close()
+
+    def _top_up(self) -> None:
+        while len(self._pending) < self.in_flight:
+            use_cache = self._next_seed == self.first_seed
+            self._pending.add(self._executor.submit(self.generate, self._next_seed, use_cache=use_cache))
+            self._next_seed += 1
+
+    def next(self) -> str | None:
+        """Return the candidate that finishes first, or None if it failed or repeats an earlier one."""
+        self._top_up()
+        done, _ = wait(self._pending, return_when=FIRST_COMPLETED)
+        future = done.pop()
+        self._pending.discard(future)
+        self._top_up()
+
+        candidate = self._accept(future)
+        self.failures = 0 if candidate else self.failures + 1
+        return candidate
+
+    def _accept(self, future: Future) -> str | None:
+        try:
+            candidate = future.result()
+        except Exception:
+            logger.exception("Candidate generation failed")
+            return None
+        if candidate is None:
+            return None
+
+        key = text_digest(candidate)
+        if key in self._shown:
+            logger.info("Discarding a candidate identical to one already shown")
+            return None
+        self._shown.add(key)
+        return candidate
+
+    def close(self) -> None:
+        """Cancel queued candidates; ones already generating finish in the background and are dropped."""
+        for future in self._pending:
+            future.cancel()
+        self._pending.clear()
+        self._executor.shutdown(wait=False, cancel_futures=True)
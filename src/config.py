@@ -1,6 +1,12 @@
 import os
+import threading
+import types
+import typing
+from collections.abc import Mapping
+from dataclasses import MISSING, dataclass, field, fields
+from datetime import time
 from pathlib import Path
-from typing import Any
+from typing import TypeVar
 
 import yaml
 from dotenv import load_dotenv
@@ -10,6 +16,334 @@ from utils import get_logger
 
 logger = get_logger(__name__)
 
+PROJECT_ROOT = Path(__file__).parent.parent
+CONFIG_PATH = PROJECT_ROOT / "config.yaml"
+
+
+class ConfigError(ValueError):
+    """Raised when config.yaml does not match the expected schema."""
+
+    def __init__(self, problems: list[str]) -> None:
+        self.problems = problems
+        super().__init__("Invalid config.yaml:\n  " + "\n  ".join(problems))
+
+
+@dataclass(frozen=True, slots=True)
+class AppConfig:
+    name: str
+    version: str
+    data_dir: Path = Path(".twinkling")
+
+
+@dataclass(frozen=True, slots=True)
+class SourceConfig:
+    path: Path
+    pattern: str = "*.md"
+
+
+@dataclass(frozen=True, slots=True)
+class TopicsConfig:
+    include: tuple[str, ...] = ()
+    avoid: tuple[str, ...] = ()
+
+
+@dataclass(frozen=True, slots=True)
+class SamplingConfig:
+    topic: float = 1.0
+    recency: float = 0.5
+    length: float = 0.25
+    posted_factor: float = 0.1
+    recency_half_life_days: float = 90.0
+
+
+@dataclass(frozen=True, slots=True)
+class ReviewConfig:
+    prefetch: int = 3
+    max_failed_candidates: int = 5
+
+
+@dataclass(frozen=True, slots=True)
+class ContentConfig:
+    topics: TopicsConfig = TopicsConfig()
+    sampling: SamplingConfig = SamplingConfig()
+    review: ReviewConfig = ReviewConfig()
+
+
+@dataclass(frozen=True, slots=True)
+class TwitterConfig:
+    tweet_length: int = 280
+    bio: str = ""
+    location: str = ""
+
+
+@dataclass(frozen=True, slots=True)
+class OutboxConfig:
+    max_attempts: int = 8
+    retry_base_seconds: float = 30.0
+    retry_max_seconds: float = 3600.0
+    drain_timeout_seconds: float = 60.0
+
+
+@dataclass(frozen=True, slots=True)
+class RateLimitConfig:
+    capacity: int
+    period_seconds: float
+
+
+@dataclass(frozen=True, slots=True)
+class RateLimitsConfig:
+    twitter: RateLimitConfig = RateLimitConfig(17, 86400.0)
+    bluesky: RateLimitConfig = RateLimitConfig(1600, 3600.0)
+
+
+@dataclass(frozen=True, slots=True)
+class ScheduleConfig:
+    slots: tuple[str, ...] = ()
+    jitter_minutes: float = 0.0
+    daily_caps: Mapping[str, int] = field(default_factory=lambda: types.MappingProxyType({}))
+
+
+@dataclass(frozen=True, slots=True)
+class PlatformsConfig:
+    twitter: TwitterConfig = TwitterConfig()
+    outbox: OutboxConfig = OutboxConfig()
+    schedule: ScheduleConfig = ScheduleConfig()
+    rate_limits: RateLimitsConfig = RateLimitsConfig()
+
+
+@dataclass(frozen=True, slots=True)
+class GenerationConfig:
+    temperature: float = 0.7
+    top_p: float = 0.9
+    seed: int = 123
+    stop: tuple[str, ...] = ("\n\n",)
+
+
+@dataclass(frozen=True, slots=True)
+class LLMCacheConfig:
+    enabled: bool = True
+    ttl_hours: float = 168.0
+    max_entries: int = 5000
+
+
+@dataclass(frozen=True, slots=True)
+class LLMConfig:
+    model: str
+    generation: GenerationConfig = GenerationConfig()
+    cache: LLMCacheConfig = LLMCacheConfig()
+    timeout_seconds: float = 60.0
+    max_retries: int = 3
+    retry_base_delay: float = 1.0
+    hedging: bool = True
+    max_connections: int = 8
+
+
+@dataclass(frozen=True, slots=True)
+class PromptsConfig:
+    tweet: str
+
+
+@dataclass(frozen=True, slots=True)
+class EmbeddingCacheConfig:
+    enabled: bool = True
+    max_entries: int = 200_000
+    dtype: str = "float16"
+
+
+@dataclass(frozen=True, slots=True)
+class EmbeddingConfig:
+    model: str
+    dimension: int
+    similarity_threshold: float = 0.85
+    similar_top_k: int = 10
+    max_similar_edges: int = 20
+    device: str = "cpu"
+    warmup: bool = True
+    workers: int = 2
+    chunk_size: int = 1000
+    cache: EmbeddingCacheConfig = EmbeddingCacheConfig()
+
+
+@dataclass(frozen=True, slots=True)
+class DatabaseConfig:
+    type: str = "neo4j"
+    uri: str = "neo4j://localhost:7687"
+    user: str = "neo4j"
+    password: str = ""
+    name: str = "neo4j"
+
+
+@dataclass(frozen=True, slots=True)
+class ProcessingConfig:
+    parallel_files: int = 4
+    batch_size: int = 500
+    embedding_batch_size: int = 32
+    memory_limit: float = 0.75
+    max_retries: int = 3
+    skip_errors: bool = True
+    show_progress: bool = True
+    log_level: str = "info"
+
+
+@dataclass(frozen=True, slots=True)
+class WatchConfig:
+    debounce_seconds: float = 2.0
+
+
+@dataclass(frozen=True, slots=True)
+class ConstraintConfig:
+    name: str
+    node: str
+    property: str
+
+
+@dataclass(frozen=True, slots=True)
+class VectorIndexConfig:
+    name: str = "block_embedding"
+    node: str = "Block"
+    property: str = "embedding"
+    algorithm: str = "cosine"
+
+
+@dataclass(frozen=True, slots=True)
+class KnowledgeBaseConfig:
+    embedding: EmbeddingConfig
+    database: DatabaseConfig = DatabaseConfig()
+    processing: ProcessingConfig = ProcessingConfig()
+    watch: WatchConfig = WatchConfig()
+    constraints: tuple[ConstraintConfig, ...] = ()
+    vector_index: VectorIndexConfig = VectorIndexConfig()
+
+
+@dataclass(frozen=True, slots=True)
+class Config:
+    app: AppConfig
+    sources: Mapping[str, SourceConfig]
+    llm: LLMConfig
+    prompts: PromptsConfig
+    knowledge_base: KnowledgeBaseConfig
+    content: ContentConfig = ContentConfig()
+    platforms: PlatformsConfig = PlatformsConfig()
+
+    @property
+    def data_dir(self) -> Path:
+        """Directory for local state such as sync manifests and caches, resolved against the project root."""
+        data_dir = self.app.data_dir.expanduser()
+        return data_dir if data_dir.is_absolute() else PROJECT_ROOT / data_dir
+
+
+# YAML keys that differ from the Python field names
+_ALIASES = {(Config, "LLM"): "llm"}
+
+_CHOICES = {
+    "knowledge_base.database.type": {"neo4j", "sqlite"},
+    "knowledge_base.embedding.cache.dtype": {"float16", "float32"},
+    "knowledge_base.embedding.device": {"cpu", "cuda", "mps"},
+}
+
+# Numbers that are divided by or used as sizes, so zero or less is rejected
+_POSITIVE = (
+    "content.sampling.recency_half_life_days",
+    "platforms.rate_limits.twitter.capacity",
+    "platforms.rate_limits.twitter.period_seconds",
+    "platforms.rate_limits.bluesky.capacity",
+    "platforms.rate_limits.bluesky.period_seconds",
+)
+
+
+_T = TypeVar("_T")
+
+
+def _convert(tp: object, value: object, path: str, problems: list[str]) -> object:  # noqa: PLR0911
+    origin = typing.get_origin(tp)
+    if isinstance(tp, type) and hasattr(tp, "__dataclass_fields__"):
+        return _build(tp, value, f"{path}.", problems)
+    if origin is tuple:
+        if not isinstance(value, list):
+            problems.append(f"{path}: expected a list, got {type(value).__name__}")
+            return ()
+        (item_type, _) = typing.get_args(tp)
+        return tuple(_convert(item_type, item, f"{path}[{i}]", problems) for i, item in enumerate(value))
+    if origin is Mapping:
+        if not isinstance(value, dict):
+            problems.append(f"{path}: expected a mapping, got {type(value).__name__}")
+            return types.MappingProxyType({})
+        (_, value_type) = typing.get_args(tp)
+        return types.MappingProxyType(
+            {key: _convert(value_type, item, f"{path}.{key}", problems) for key, item in value.items()},
+        )
+    if tp is Path:
+        if not isinstance(value, str):
+            problems.append(f"{path}: expected a path string, got {type(value).__name__}")
+            return Path()
+        return Path(value)
+    if tp is float and isinstance(value, int) and not isinstance(value, bool):
+        return float(value)
+    if not isinstance(value, tp) or (tp is int and isinstance(value, bool)):  # type: ignore[arg-type]
+        problems.append(f"{path}: expected {getattr(tp, '__name__', tp)}, got {type(value).__name__}")
+    return value
+
+
+def _build(cls: type[_T], raw: object, path: str, problems: list[str]) -> _T | None:
+    if not isinstance(raw, dict):
+        problems.append(f"{path.rstrip('.') or '<root>'}: expected a mapping, got {type(raw).__name__}")
+        return None
+
+    raw = {_ALIASES.get((cls, key), key): value for key, value in raw.items()}
+    hints = typing.get_type_hints(cls)
+    names = {f.name for f in fields(cls)}
+    problems.extend(f"{path}{key}: unknown key" for key in raw if key not in names)
+
+    values = {}
+    for f in fields(cls):
+        key_path = f"{path}{f.name}"
+        if f.name in raw:
+            values[f.name] = _convert(hints[f.name], raw[f.name], key_path, problems)
+        elif f.default is MISSING and f.default_factory is MISSING:
+            problems.append(f"{key_path}: missing required key")
+    try:
+        return cls(**values)
+    except TypeError:
+        # A required key is missing; it has already been reported
+        return None
+
+
+def _lookup(config: Config, key_path: str) -> object:
+    value: object = config
+    for part in key_path.split("."):
+        value = getattr(value, part)
+    return value
+
+
+def parse_config(raw: object) -> Config:
+    """Validate a raw YAML mapping and turn it into a ``Config``.
+
+    Raises
+    ------
+    ConfigError
+        Listing every unknown, missing or mistyped key found.
+    """
+    problems: list[str] = []
+    config = _build(Config, raw, "", problems)
+    # Sections that failed to build are None, so choices are only checked on a complete config
+    if config is not None and not problems:
+        for key_path, choices in _CHOICES.items():
+            value = _lookup(config, key_path)
+            if value not in choices:
+                problems.append(f"{key_path}: {value!r} is not one of {sorted(choices)}")
+        for key_path in _POSITIVE:
+            value = _lookup(config, key_path)
+            if isinstance(value, int | float) and value <= 0:
+                problems.append(f"{key_path}: must be greater than 0, got {value!r}")
+        for i, slot in enumerate(config.platforms.schedule.slots):
+            try:
+                time.fromisoformat(slot)
+            except ValueError:  # noqa: PERF203
+                problems.append(f"platforms.schedule.slots[{i}]: {slot!r} is not a HH:MM time")
+    if problems:
+        raise ConfigError(problems)
+    return config
+
 
 def load_env_vars() -> None:
     """Load environment variables from .env file and validate required vars exist."""
@@ -32,13 +366,15 @@ def load_env_vars() -> None:
         raise ValueError(msg)
 
 
-def load_config() -> dict[str, Any]:
-    """Load configuration from YAML file.
+def load_config(config_path: Path = CONFIG_PATH) -> Config:
+    """Load and validate configuration from a YAML file.
+
+    Prefer ``get_config``, which parses the file once per process.
 
     Returns
     -------
-    dict[str, Any]
-        The loaded configuration dictionary.
+    Config
+        The validated configuration.
 
     Raises
     ------
@@ -46,14 +382,54 @@ def load_config() -> dict[str, Any]:
         If the config file cannot be found.
     yaml.YAMLError
         If the config file cannot be parsed.
+    ConfigError
+        If the config file does not match the expected schema.
     """
-    config_path = Path(__file__).parent.parent / "config.yaml"
     try:
         with config_path.open() as file:
-            return yaml.safe_load(file)
+            raw = yaml.safe_load(file)
     except FileNotFoundError:
         logger.exception("Config file not found: %s", config_path)
         raise
     except yaml.YAMLError:
         logger.exception("Error parsing config file")
         raise
+    return parse_config(raw)
+
+
+_config: Config | None = None
+_config_lock = threading.Lock()
+
+
+def get_config() -> Config:
+    """Return the process-wide configuration, loading it on first use.
+
+    Returns
+    -------
+    Config
+        The shared, immutable configuration.
+    """
+    global _config  # noqa: PLW0603
+    if _config is None:
+        with _config_lock:
+            if _config is None:
+                _config = load_config()
+    return _config
+
+
+def reload_config() -> Config:
+    """Re-read config.yaml and replace the shared configuration (for long-running modes).
+
+    Objects that already hold the previous ``Config`` keep using it until recreated.
+
+    Returns
+    -------
+    Config
+        The freshly loaded configuration.
+    """
+    global _config  # noqa: PLW0603
+    new_config = load_config()
+    with _config_lock:
+        _config = new_config
+    logger.info("Configuration reloaded from %s", CONFIG_PATH)
+    return new_config
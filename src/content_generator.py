@@ -1,4 +1,8 @@
+from collections.abc import Sequence
+
+from config import PromptsConfig
 from model_manager import ModelManager
+from post_history import PostHistory
 from utils import get_logger
 
 
@@ -6,7 +10,12 @@ class ContentGenerator:
     """Class responsible for generating content using an AI model."""
 
     def __init__(
-        self, model_manager: ModelManager, prompts: dict[str, str], topics: list[str], topics_to_avoid: list[str],
+        self,
+        model_manager: ModelManager,
+        prompts: PromptsConfig,
+        topics: Sequence[str],
+        topics_to_avoid: Sequence[str],
+        history: PostHistory | None = None,
     ) -> None:
         """Initialize the ContentGenerator.
 
@@ -14,39 +23,49 @@ class ContentGenerator:
         ----------
         model_manager : ModelManager
             Manager for interacting with the AI model.
-        prompts : dict[str, str]
-            Dictionary of prompt templates.
-        topics : list[str]
-            List of topics to focus on.
-        topics_to_avoid : list[str]
-            List of topics to avoid.
+        prompts : PromptsConfig
+            Prompt templates.
+        topics : Sequence[str]
+            Topics to focus on.
+        topics_to_avoid : Sequence[str]
+            Topics to avoid.
+        history : PostHistory | None, optional
+            Record of past posts; text that was already posted is rejected.
         """
         self.model_manager = model_manager
         self.prompts = prompts
         self.topics = topics
         self.topics_to_avoid = topics_to_avoid
+        self.history = history
         self.logger = get_logger(__name__)
 
-    def generate_tweet(self, note_content: str) -> str | None:
+    def generate_tweet(self, note_content: str, seed: int | None = None, *, use_cache: bool = True) -> str | None:
         """Generate a tweet from the given note content.
 
         Parameters
         ----------
         note_content : str
             The content to base the tweet on.
+        seed : int | None, optional
+            Sampling seed, so repeated calls can produce different tweets.
+        use_cache : bool, optional
+            Whether a cached model response may be used, by default True.
 
         Returns
         -------
         str | None
-            The generated tweet text, or None if generation failed.
+            The generated tweet text, or None if generation failed or produced an earlier post.
         """
-        prompt = self.prompts["tweet_generation"].format(
+        prompt = self.prompts.tweet.format(
             note_content=note_content,
             topics=", ".join(self.topics),
             topics_to_avoid=", ".join(self.topics_to_avoid),
         )
         self.logger.info("Generating tweet with prompt: %s...", prompt[:50])
-        tweet = self.model_manager.generate_content(prompt)
+        tweet = self.model_manager.generate_content(prompt, seed=seed, use_cache=use_cache)
         if tweet is None:
             self.logger.warning("Failed to generate tweet content")
+        elif self.history is not None and self.history.has_text(tweet):
+            self.logger.warning("Generated tweet was already posted before, discarding it")
+            return None
         return tweet
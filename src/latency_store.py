@@ -0,0 +1,63 @@
+import sqlite3
+import threading
+from pathlib import Path
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS latencies (
+    id INTEGER PRIMARY KEY,
+    model TEXT NOT NULL,
+    seconds REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS latencies_model ON latencies (model, id);
+"""
+
+
+class LatencyStore:
+    """SQLite record of the latest model call latencies, so latency percentiles carry over between runs.
+
+    Only the latest ``keep`` latencies per model are kept.
+    """
+
+    def __init__(self, path: Path, keep: int) -> None:
+        self.keep = keep
+        self._lock = threading.Lock()
+        self._closed = False
+
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(SCHEMA)
+
+    def close(self) -> None:
+        """Close the database; later reads are empty and later records are dropped."""
+        with self._lock:
+            self._closed = True
+            self._conn.close()
+
+    def latencies(self, model: str) -> list[float]:
+        """Return the latest latencies recorded for ``model``, oldest first."""
+        with self._lock:
+            if self._closed:
+                return []
+            rows = self._conn.execute(
+                "SELECT seconds FROM latencies WHERE model = ? ORDER BY id DESC LIMIT ?",
+                (model, self.keep),
+            ).fetchall()
+        return [seconds for (seconds,) in reversed(rows)]
+
+    def record(self, model: str, seconds: float) -> None:
+        """Record a call latency for ``model``, dropping its samples beyond the latest ``keep``."""
+        with self._lock:
+            if self._closed:
+                return
+            with self._conn:
+                self._conn.execute("INSERT INTO latencies (model, seconds) VALUES (?, ?)", (model, seconds))
+                self._conn.execute(
+                    """
+                    DELETE FROM latencies WHERE model = ? AND id NOT IN (
+                        SELECT id FROM latencies WHERE model = ? ORDER BY id DESC LIMIT ?
+                    )
+                    """,
+                    (model, model, self.keep),
+                )
@@ -1,76 +1,180 @@
-from config import load_config, load_env_vars
+from argparse import Namespace
+from collections.abc import Callable
+from contextlib import closing
+from functools import partial
+
+from candidates import CandidatePrefetcher
+from config import Config, get_config, load_env_vars
 from content_generator import ContentGenerator
 from model_manager import ModelManager
 from note_manager import NoteManager
-from rag.knowledge_base import KnowledgeBaseProcessor
+from outbox import Delivery, Outbox, OutboxWorker
+from post_history import PostHistory
+from scheduler import PostingScheduler
 from social_media import initialize_platforms
-from utils import parse_args, setup_logging
+from topic_matcher import TopicMatcher
+from utils import get_logger, parse_args, setup_logging
+
+
+logger = get_logger()
+
+
+def sync_knowledge_base() -> None:
+    from rag.knowledge_base import KnowledgeBaseProcessor  # noqa: PLC0415
+
+    kb_processor = KnowledgeBaseProcessor()
+    logger.info("Synchronizing knowledge base...")
+    try:
+        kb_processor.sync_knowledge_base()
+    finally:
+        kb_processor.close()
+
+
+def watch_knowledge_base(config: Config) -> None:
+    from rag.knowledge_base import KnowledgeBaseProcessor  # noqa: PLC0415
+    from rag.watcher import KnowledgeBaseWatcher  # noqa: PLC0415
+
+    kb_processor = KnowledgeBaseProcessor()
+    try:
+        KnowledgeBaseWatcher(kb_processor, config.knowledge_base.watch.debounce_seconds).run()
+    except KeyboardInterrupt:
+        logger.info("Stopped watching the knowledge base")
+    finally:
+        kb_processor.close()
+
+
+def run_daemon(args: Namespace, config: Config, outbox: Outbox, record_sent: Callable[[Delivery], None]) -> None:
+    # Platform clients are created once and reused for every slot
+    posters = initialize_platforms(args)
+    if not posters:
+        logger.error("--daemon needs --platform or --all")
+        return
+    worker = OutboxWorker(outbox, posters, config.platforms.outbox, record_sent)
+    scheduler = PostingScheduler(outbox, worker, config.platforms.schedule)
+    try:
+        scheduler.run()
+    except KeyboardInterrupt:
+        logger.info("Stopped the posting daemon")
+
+
+def review_candidates(candidates: CandidatePrefetcher, max_failed: int) -> str | None:
+    """Show candidates until the user approves one, and return it; None if they give up."""
+    while True:
+        tweet_content = candidates.next()
+        if not tweet_content:
+            if candidates.failures < max_failed:
+                continue
+            prompt = f"{candidates.failures} candidates in a row failed or repeated. Keep trying? [Yes/No]: "
+            if input(prompt).lower() != "yes":
+                return None
+            candidates.failures = 0
+            continue
+
+        print("\nGenerated content:")
+        print("-----------------")
+        print(tweet_content)
+        print("-----------------\n")
+
+        choice = input("Do you want to post this content? [Yes/No/Retry]: ").lower()
+        if choice == "yes":
+            return tweet_content
+        if choice == "no":
+            return None
 
 
 def main() -> None:
     try:
-        logger = setup_logging()
+        setup_logging()
         logger.info("Starting the application...")
         args = parse_args()
 
         # Load environment variables and config
         load_env_vars()
-        config = load_config()
+        config = get_config()
         logger.info("Config loaded successfully")
 
-        # Handle knowledge base operations
+        # Handle knowledge base operations. The RAG stack (torch, sentence-transformers, DB drivers)
+        # is imported only by these helpers so the generate-and-post path starts quickly.
         if args.sync_kb:
-            kb_processor = KnowledgeBaseProcessor()
-            logger.info("Synchronizing knowledge base...")
-            kb_processor.sync_knowledge_base()
+            sync_knowledge_base()
+            return
+
+        if args.watch_kb:
+            watch_knowledge_base(config)
+            return
+
+        history = PostHistory(config.data_dir / "post_history.sqlite3")
+        outbox = Outbox(config.data_dir / "outbox.sqlite3")
+
+        def record_sent(sent: Delivery) -> None:
+            history.record(sent.content, [sent.platform], sent.note_path, sent.note_hash)
+
+        if args.daemon:
+            try:
+                run_daemon(args, config, outbox, record_sent)
+            finally:
+                outbox.close()
             return
 
         # Initialize components
-        note_manager = NoteManager(config["notes_directory"])
+        topics = config.content.topics
+        note_manager = NoteManager(
+            config.sources.values(),
+            config.data_dir / "note_index.json",
+            TopicMatcher(topics.include, topics.avoid),
+            config.content.sampling,
+            history,
+        )
         model_manager = ModelManager()
         content_generator = ContentGenerator(
             model_manager,
-            config["prompts"],
-            config["topics"],
-            config["topics_to_avoid"],
+            config.prompts,
+            topics.include,
+            topics.avoid,
+            history,
         )
 
-        # Get platforms and note content
+        # Get platforms and start sending queued posts, including any left over from earlier runs.
+        # With posting slots configured, approved posts wait in the outbox for the --daemon instead.
         posters = initialize_platforms(args)
-        note_content, note_filename = note_manager.get_note_content()
+        scheduled = bool(config.platforms.schedule.slots)
+        outbox_worker = OutboxWorker(outbox, posters, config.platforms.outbox, record_sent)
+        if not scheduled:
+            outbox_worker.start()
 
-        if not note_content:
-            return
+        try:
+            note_content, note_filename = note_manager.get_note_content()
 
-        # Generate and post content
-        while True:
-            tweet_content = content_generator.generate_tweet(note_content)
-            if not tweet_content:
-                continue
+            if not note_content:
+                return
+
+            # Generate and post content, with the next candidates already generating while one is reviewed
+            # The prefetcher exits first, so no new requests reach the manager while it shuts down
+            with (
+                closing(model_manager),
+                CandidatePrefetcher(
+                    partial(content_generator.generate_tweet, note_content),
+                    config.content.review.prefetch,
+                    config.llm.generation.seed,
+                ) as candidates,
+            ):
+                tweet_content = review_candidates(candidates, config.content.review.max_failed_candidates)
 
-            print("\nGenerated content:")
-            print("-----------------")
-            print(tweet_content)
-            print("-----------------\n")
-
-            choice = input("Do you want to post this content? [Yes/No/Retry]: ").lower()
-            if choice == "yes":
-                success = True
-                for platform_name, poster in posters:
-                    logger.info(f"Attempting to post to {platform_name}...")
-                    try:
-                        if not poster.post_tweet(tweet_content):
-                            logger.error(f"Failed to post to {platform_name}")
-                            success = False
-                        else:
-                            logger.info(f"Successfully posted to {platform_name}")
-                    except Exception as e:
-                        logger.exception(f"Exception while posting to {platform_name}: {str(e)}")
-                        success = False
-                if success:
-                    break
-            elif choice == "no":
-                break
+            if tweet_content:
+                # Queued durably; the worker posts it and retries failed platforms with backoff
+                outbox.enqueue(
+                    tweet_content,
+                    [name for name, _ in posters],
+                    note_manager.current_note,
+                    note_manager.current_note_hash(),
+                )
+                if scheduled:
+                    logger.info("Queued; the --daemon posts it at the next posting slot")
+                else:
+                    outbox_worker.notify()
+        finally:
+            outbox_worker.stop(config.platforms.outbox.drain_timeout_seconds)
+            outbox.close()
 
     except Exception:
         logger.exception("An error occurred")
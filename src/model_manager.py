@@ -1,24 +1,96 @@
+import asyncio
+import concurrent.futures
 import os
+import random
+import threading
+import time
+from collections import Counter, deque
+from types import ModuleType
+from typing import TYPE_CHECKING
 
-from litellm import completion
-
-from config import load_config
+from config import get_config
+from latency_store import LatencyStore
+from response_cache import ResponseCache, request_key
 from utils import get_logger
 
 
+if TYPE_CHECKING:
+    from collections.abc import Awaitable, Callable
+
+    from litellm import ModelResponse
+
+    Completion = Callable[..., Awaitable[ModelResponse]]
+
+
+# Successful call latencies kept for the percentiles that drive hedging and the stats log
+LATENCY_WINDOW = 200
+# Hedging starts once this many latencies have been observed, in this run or earlier ones
+HEDGE_MIN_SAMPLES = 20
+
+
+class LatencyTracker:
+    """Rolling window of call latencies."""
+
+    def __init__(self, window: int = LATENCY_WINDOW) -> None:
+        self.samples: deque[float] = deque(maxlen=window)
+
+    def record(self, seconds: float) -> None:
+        self.samples.append(seconds)
+
+    def percentile(self, q: float, min_samples: int = 1) -> float | None:
+        """Return the ``q`` quantile (0..1) of the window, or None with fewer than ``min_samples`` samples."""
+        if len(self.samples) < max(1, min_samples):
+            return None
+        ordered = sorted(self.samples)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+async def _cancel_tasks() -> None:
+    """Cancel every other task on the running loop and wait until they have finished."""
+    tasks = [task for task in asyncio.all_tasks() if task is not asyncio.current_task()]
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+
+
 class ModelManager:
-    """Manager for handling AI model interactions."""
+    """Manager for handling AI model interactions.
+
+    Requests are made with litellm's ``acompletion`` on one background event loop, so
+    concurrent callers share a pooled HTTP client. Each attempt is bounded by
+    ``LLM.timeout_seconds``; transient failures (timeouts, rate limits, connection and
+    5xx errors) are retried with jittered exponential backoff, other errors fail at
+    once. With ``LLM.hedging`` on, a request still running after the observed p95
+    latency gets a duplicate, and whichever answers first wins. Successful responses
+    are cached on disk (``LLM.cache``), so an identical request is answered locally.
+    Latencies are kept on disk too, independently of the cache, so hedging has a p95
+    from the first call of a run.
+    """
 
     def __init__(self) -> None:
         """Initialize the ModelManager with configuration and environment setup."""
         self.logger = get_logger(__name__)
-        config = load_config()
-        self.config = config.get("ai", {}).get("model", {})
-        if not self.config:
-            msg = "Model configuration not found in config.yaml"
-            raise ValueError(msg)
+        config = get_config()
+        self.config = config.llm
         self.setup_environment()
-        self.logger.info("ModelManager initialized with model: %s", self.config["name"])
+        self.latency_store = LatencyStore(config.data_dir / "llm_latencies.sqlite3", LATENCY_WINDOW)
+        cache_config = self.config.cache
+        self.cache = (
+            ResponseCache(
+                config.data_dir / "llm_cache.sqlite3",
+                cache_config.ttl_hours * 3600,
+                cache_config.max_entries,
+            )
+            if cache_config.enabled
+            else None
+        )
+        self.latency = LatencyTracker()
+        self.latency.samples.extend(self.latency_store.latencies(self.config.model))
+        self.stats: Counter[str] = Counter()
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._loop_lock = threading.Lock()
+        self._closed = False
+        self.logger.info("ModelManager initialized with model: %s", self.config.model)
 
     def setup_environment(self) -> None:
         """Set up required environment variables for the model.
@@ -35,41 +107,141 @@ class ModelManager:
             raise ValueError(msg)
         os.environ["SAMBANOVA_API_KEY"] = sambanova_api_key
 
-    def generate_content(self, prompt: str, max_tokens: int = 280) -> str | None:
+    def _event_loop(self) -> asyncio.AbstractEventLoop | None:
+        with self._loop_lock:
+            if self._closed:
+                return None
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                threading.Thread(target=self._loop.run_forever, name="model-manager", daemon=True).start()
+            return self._loop
+
+    def close(self) -> None:
+        """Stop the background event loop, then log call statistics and close the on-disk stores.
+
+        Requests still in flight are cancelled, so callers blocked in ``generate_content``
+        get a None instead of waiting on a loop that no longer runs.
+        """
+        with self._loop_lock:
+            loop, self._loop = self._loop, None
+            self._closed = True
+        if loop is not None:
+            try:
+                asyncio.run_coroutine_threadsafe(_cancel_tasks(), loop).result(self.config.timeout_seconds)
+            except Exception:
+                self.logger.exception("Error cancelling in-flight model requests")
+            loop.call_soon_threadsafe(loop.stop)
+        self.log_stats()
+        self.latency_store.close()
+        if self.cache is not None:
+            self.cache.log_stats()
+            self.cache.close()
+            self.cache = None
+
+    def generate_content(
+        self,
+        prompt: str,
+        max_tokens: int = 280,
+        seed: int | None = None,
+        *,
+        use_cache: bool = True,
+    ) -> str | None:
         """Generate content using the AI model.
 
+        Blocking wrapper around ``agenerate_content``, safe to call from several threads.
+
         Parameters
         ----------
         prompt : str
             The prompt to generate content from.
         max_tokens : int, optional
             Maximum number of tokens to generate, by default 280.
+        seed : int | None, optional
+            Sampling seed, by default the configured ``LLM.generation.seed``.
+        use_cache : bool, optional
+            Whether a cached response may be returned, by default True.
 
         Returns
         -------
         str | None
             Generated content if successful, None otherwise.
         """
+        loop = self._event_loop()
+        if loop is None:
+            self.logger.warning("ModelManager is closed, not generating content")
+            return None
+        coroutine = self.agenerate_content(prompt, max_tokens, seed, use_cache=use_cache)
+        try:
+            return asyncio.run_coroutine_threadsafe(coroutine, loop).result()
+        except concurrent.futures.CancelledError:
+            return None
+
+    async def agenerate_content(
+        self,
+        prompt: str,
+        max_tokens: int = 280,
+        seed: int | None = None,
+        *,
+        use_cache: bool = True,
+    ) -> str | None:
+        """Generate content using the AI model.
+
+        Parameters
+        ----------
+        prompt : str
+            The prompt to generate content from.
+        max_tokens : int, optional
+            Maximum number of tokens to generate, by default 280.
+        seed : int | None, optional
+            Sampling seed, by default the configured ``LLM.generation.seed``.
+        use_cache : bool, optional
+            Whether a cached response may be returned, by default True. The fresh
+            response is cached either way.
+
+        Returns
+        -------
+        str | None
+            Generated content if successful, None if every attempt failed.
+        """
+        generation = self.config.generation
+        seed = generation.seed if seed is None else seed
+        cache_key = request_key(
+            model=self.config.model,
+            prompt=prompt,
+            temperature=generation.temperature,
+            top_p=generation.top_p,
+            seed=seed,
+            max_tokens=max_tokens,
+            stop=generation.stop,
+        )
+        # A local reference, so a concurrent close cannot swap the cache for None mid-request
+        cache = self.cache
+        if use_cache and cache is not None and (cached := cache.get(cache_key)) is not None:
+            self.logger.info("Using cached response for prompt: %s...", prompt[:50])
+            return cached
+
+        request = {
+            "model": f"sambanova/{self.config.model}",
+            "messages": [
+                {
+                    "role": "user",
+                    "content": prompt,
+                },
+            ],
+            "max_tokens": max_tokens,
+            "temperature": generation.temperature,
+            "top_p": generation.top_p,
+            "stop": list(generation.stop),
+            "response_format": {"type": "json_object"},
+            "seed": seed,
+            "tool_choice": "auto",
+            "tools": [],
+            "user": "user",
+        }
+
         try:
             self.logger.info("Generating content with prompt: %s...", prompt[:50])
-            response = completion(
-                model=f"sambanova/{self.config['name']}",
-                messages=[
-                    {
-                        "role": "user",
-                        "content": prompt,
-                    },
-                ],
-                max_tokens=max_tokens,
-                temperature=self.config.get("temperature", 0.7),
-                top_p=self.config.get("top_p", 0.9),
-                stop=self.config.get("stop", ["\n\n"]),
-                response_format={"type": "json_object"},
-                seed=self.config.get("seed", 123),
-                tool_choice="auto",
-                tools=[],
-                user="user",
-            )
+            response = await self._complete_with_retries(request)
 
             self.logger.info("Response received")
             self.logger.debug("Full response: %s", response)
@@ -77,14 +249,118 @@ class ModelManager:
             if isinstance(response.choices, list) and response.choices:
                 content = response.choices[0].message.content.strip()
                 self.logger.info("Generated content: %s...", content[:50])
+                if cache is not None:
+                    cache.put(cache_key, content)
                 return content
 
             self.logger.error("No content generated in the response")
         except Exception:
+            self.stats["failures"] += 1
             self.logger.exception("Error generating content")
 
         return None
 
+    async def _complete_with_retries(self, request: dict[str, object]) -> "ModelResponse":
+        # litellm takes seconds to import, so defer it until content is actually generated
+        import litellm  # noqa: PLC0415
+
+        retryable = (
+            asyncio.TimeoutError,
+            litellm.Timeout,
+            litellm.RateLimitError,
+            litellm.APIConnectionError,
+            litellm.InternalServerError,
+            litellm.ServiceUnavailableError,
+        )
+        self._ensure_http_client(litellm)
+
+        attempt = 0
+        while True:
+            try:
+                return await self._hedged_completion(litellm.acompletion, request)
+            except retryable as e:  # noqa: PERF203
+                if attempt >= self.config.max_retries:
+                    raise
+                self.stats["retries"] += 1
+                # Full jitter keeps concurrent callers from retrying in lockstep; rate limits back off harder
+                base = self.config.retry_base_delay * (4 if isinstance(e, litellm.RateLimitError) else 1)
+                delay = random.uniform(0, base * 2**attempt)  # noqa: S311
+                self.logger.warning("%s from the model API, retrying in %.1fs", type(e).__name__, delay)
+                await asyncio.sleep(delay)
+                attempt += 1
+
+    def _ensure_http_client(self, litellm: ModuleType) -> None:
+        """Give litellm one pooled async HTTP client, created on (and used only from) the background loop."""
+        if litellm.aclient_session is None:
+            import httpx  # noqa: PLC0415
+
+            litellm.aclient_session = httpx.AsyncClient(
+                limits=httpx.Limits(
+                    max_connections=self.config.max_connections,
+                    max_keepalive_connections=self.config.max_connections,
+                ),
+                timeout=self.config.timeout_seconds,
+            )
+
+    async def _hedged_completion(self, acompletion: "Completion", request: dict[str, object]) -> "ModelResponse":
+        start = time.perf_counter()
+        first = asyncio.ensure_future(self._timed_call(acompletion, request))
+        tasks = {first}
+        try:
+            hedge_after = self.latency.percentile(0.95, HEDGE_MIN_SAMPLES) if self.config.hedging else None
+            if hedge_after is not None:
+                done, _ = await asyncio.wait(tasks, timeout=hedge_after)
+                if not done:
+                    self.stats["hedges"] += 1
+                    tasks.add(asyncio.ensure_future(self._timed_call(acompletion, request)))
+
+            error: BaseException | None = None
+            while tasks:
+                done, tasks = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is not first:
+                            self.stats["hedge_wins"] += 1
+                        self._record_latency(time.perf_counter() - start)
+                        self.stats["calls"] += 1
+                        return task.result()
+                    error = error or task.exception()
+            raise error
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    def _record_latency(self, seconds: float) -> None:
+        self.latency.record(seconds)
+        self.latency_store.record(self.config.model, seconds)
+
+    async def _timed_call(self, acompletion: "Completion", request: dict[str, object]) -> "ModelResponse":
+        timeout = self.config.timeout_seconds
+        try:
+            return await asyncio.wait_for(acompletion(**request, timeout=timeout), timeout)
+        except asyncio.TimeoutError:
+            self.stats["timeouts"] += 1
+            raise
+
+    def log_stats(self) -> None:
+        if not self.stats:
+            return
+        p50, p95, p99 = (self.latency.percentile(q) or 0.0 for q in (0.5, 0.95, 0.99))
+        self.logger.info(
+            "Model calls: %d ok, %d failed, %d retries, %d timeouts, %d hedged (%d won by the hedge); "
+            "latency p50 %.2fs, p95 %.2fs, p99 %.2fs, max %.2fs",
+            self.stats["calls"],
+            self.stats["failures"],
+            self.stats["retries"],
+            self.stats["timeouts"],
+            self.stats["hedges"],
+            self.stats["hedge_wins"],
+            p50,
+            p95,
+            p99,
+            max(self.latency.samples, default=0.0),
+        )
+
     def get_model_info(self) -> str:
         """Get information about the current model.
 
@@ -93,9 +369,10 @@ class ModelManager:
         str
             Description of the model being used.
         """
-        return f"Using Sambanova model: {self.config['name']}"
+        return f"Using Sambanova model: {self.config.model}"
 
 
 if __name__ == "__main__":
     manager = ModelManager()
     result = manager.generate_content("Write a short tweet about Python programming.")
+    manager.close()
@@ -0,0 +1,140 @@
+import hashlib
+import json
+import re
+from collections import defaultdict
+from collections.abc import Iterable
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+
+from config import SourceConfig
+from topic_matcher import TopicMatcher
+from utils import get_logger
+
+
+logger = get_logger(__name__)
+
+INDEX_VERSION = 3
+
+HASHTAG_PATTERN = re.compile(r"#\[\[(.*?)\]\]|#([^\s#\[\]]+)")
+WIKILINK_PATTERN = re.compile(r"(?<!#)\[\[(.*?)\]\]")
+
+
+@dataclass
+class NoteEntry:
+    mtime: float
+    size: int
+    content_hash: str
+    length: int
+    tags: list[str] = field(default_factory=list)
+    links: list[str] = field(default_factory=list)
+    topic_hits: dict[str, int] = field(default_factory=dict)
+    avoid_hits: dict[str, int] = field(default_factory=dict)
+
+    @classmethod
+    def from_content(cls, content: str, mtime: float, size: int, matcher: TopicMatcher) -> "NoteEntry":
+        tags = {(bracketed or plain).lower() for bracketed, plain in HASHTAG_PATTERN.findall(content)}
+        links = {link.lower() for link in WIKILINK_PATTERN.findall(content)}
+        hits = matcher.match(content)
+        content_hash = hashlib.blake2b(content.encode(), digest_size=16).hexdigest()
+        return cls(mtime, size, content_hash, len(content), sorted(tags), sorted(links), hits.include, hits.avoid)
+
+    @property
+    def on_topic(self) -> bool:
+        return bool(self.topic_hits) and not self.avoid_hits
+
+
+class NoteIndex:
+    """On-disk index of the notes in every configured source.
+
+    Each note is stored with its stat signature and what the note pickers need
+    (tags, wiki-links, per-topic hit counts, length), so lookups never read the vault.
+    ``refresh`` stats every file but only re-reads those whose mtime or size moved.
+    The index is rebuilt from scratch when the configured topics change.
+    """
+
+    def __init__(
+        self,
+        path: Path,
+        sources: Iterable[SourceConfig],
+        matcher: TopicMatcher,
+        entries: dict[str, NoteEntry] | None = None,
+    ) -> None:
+        self.path = path
+        self.sources = tuple(sources)
+        self.matcher = matcher
+        self.entries: dict[str, NoteEntry] = entries or {}
+        # Tag lookup table derived from the entries, rebuilt lazily after a refresh changes them
+        self._by_tag: dict[str, list[str]] | None = None
+        self._dirty = False
+
+    @classmethod
+    def load(cls, path: Path, sources: Iterable[SourceConfig], matcher: TopicMatcher) -> "NoteIndex":
+        """Load the index, starting empty if it is missing, unreadable or built for other topics."""
+        try:
+            raw = json.loads(path.read_text(encoding="utf-8"))
+        except FileNotFoundError:
+            return cls(path, sources, matcher)
+        except (OSError, ValueError):
+            logger.exception("Could not read note index %s, rebuilding it", path)
+            return cls(path, sources, matcher)
+
+        if raw.get("version") != INDEX_VERSION or raw.get("topics") != matcher.fingerprint:
+            logger.info("Note index %s is out of date, rebuilding it", path)
+            return cls(path, sources, matcher)
+
+        return cls(path, sources, matcher, {file: NoteEntry(**entry) for file, entry in raw["notes"].items()})
+
+    def refresh(self) -> None:
+        """Bring the index up to date with the sources, reading only new or modified notes."""
+        seen = set()
+        updated = 0
+        for source in self.sources:
+            for file_path in source.path.glob(source.pattern):
+                file_str = str(file_path)
+                seen.add(file_str)
+                try:
+                    stat = file_path.stat()
+                    entry = self.entries.get(file_str)
+                    if entry is not None and entry.mtime == stat.st_mtime and entry.size == stat.st_size:
+                        continue
+                    content = file_path.read_text(encoding="utf-8")
+                except (OSError, UnicodeDecodeError):
+                    logger.exception("Error indexing note %s", file_path.name)
+                    continue
+                self.entries[file_str] = NoteEntry.from_content(content, stat.st_mtime, stat.st_size, self.matcher)
+                updated += 1
+
+        removed = self.entries.keys() - seen
+        for file_str in removed:
+            del self.entries[file_str]
+
+        if updated or removed:
+            self._by_tag = None
+            self._dirty = True
+            logger.info("Note index: %d notes, %d updated, %d removed", len(self.entries), updated, len(removed))
+
+    def tagged(self, tag: str) -> list[str]:
+        """Paths of the notes carrying ``#tag`` (case-insensitive)."""
+        if self._by_tag is None:
+            by_tag = defaultdict(list)
+            for file_str, entry in self.entries.items():
+                for note_tag in entry.tags:
+                    by_tag[note_tag].append(file_str)
+            self._by_tag = dict(by_tag)
+        return self._by_tag.get(tag.lstrip("#").lower(), [])
+
+    def save(self) -> None:
+        """Atomically write the index back to disk if anything changed."""
+        if not self._dirty:
+            return
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_suffix(self.path.suffix + ".tmp")
+        payload = {
+            "version": INDEX_VERSION,
+            "topics": self.matcher.fingerprint,
+            "notes": {file: asdict(entry) for file, entry in self.entries.items()},
+        }
+        tmp_path.write_text(json.dumps(payload, separators=(",", ":")), encoding="utf-8")
+        tmp_path.replace(self.path)
+        self._dirty = False
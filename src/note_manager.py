@@ -1,26 +1,81 @@
+import random
+from collections.abc import Iterable
+from functools import cached_property
 from pathlib import Path
-from random import shuffle
 
 from markdown import Markdown
 
+from config import SamplingConfig, SourceConfig
+from note_index import NoteIndex
+from note_sampler import NoteSampler
+from post_history import PostHistory
+from topic_matcher import TopicMatcher
 from utils import get_logger
 
 
 class NoteManager:
     """Manager for handling note files and their content."""
 
-    def __init__(self, notes_directory: str) -> None:
+    def __init__(
+        self,
+        sources: Iterable[SourceConfig],
+        index_path: Path,
+        matcher: TopicMatcher,
+        sampling: SamplingConfig,
+        history: PostHistory | None = None,
+    ) -> None:
         """Initialize the NoteManager.
 
         Parameters
         ----------
-        notes_directory : str
-            Path to the directory containing notes.
+        sources : Iterable[SourceConfig]
+            Note directories and the glob pattern matching notes in each.
+        index_path : Path
+            Where the note index is persisted between runs.
+        matcher : TopicMatcher
+            Matcher for the configured include and avoid topics.
+        sampling : SamplingConfig
+            Weights for picking a random on-topic note.
+        history : PostHistory | None, optional
+            Record of past posts; notes already posted from are picked less often.
         """
-        self.notes_directory = Path(notes_directory)
+        self.sources = tuple(sources)
+        self.index_path = index_path
+        self.matcher = matcher
+        self.sampling = sampling
+        self.history = history
+        # Path of the note most recently returned by get_note_content
+        self.current_note: Path | None = None
         self.md = Markdown()
         self.logger = get_logger(__name__)
 
+    @cached_property
+    def index(self) -> NoteIndex:
+        """Note index, loaded and brought up to date on first use."""
+        index = NoteIndex.load(self.index_path, self.sources, self.matcher)
+        index.refresh()
+        index.save()
+        return index
+
+    @cached_property
+    def sampler(self) -> NoteSampler:
+        """Weighted sampler over the on-topic notes of the index."""
+        return NoteSampler(self.index, self.sampling, self.is_posted if self.history is not None else None)
+
+    def is_posted(self, path: str) -> bool:
+        """Whether a post was already made from the note at ``path``, or from the same content elsewhere."""
+        if self.history is None:
+            return False
+        entry = self.index.entries.get(path)
+        return self.history.has_note(path) or (entry is not None and self.history.has_note_hash(entry.content_hash))
+
+    def current_note_hash(self) -> str | None:
+        """Content hash of the current note as indexed, for recording it in the post history."""
+        if self.current_note is None:
+            return None
+        entry = self.index.entries.get(str(self.current_note))
+        return entry.content_hash if entry is not None else None
+
     def get_note_content(self) -> tuple[str | None, str | None]:
         """Get note content based on user input.
 
@@ -32,6 +87,7 @@ class NoteManager:
         tag = input("Enter a tag for the note (leave empty for random): ").strip()
         self.logger.info("User entered tag: '%s'", tag)
 
+        self.current_note = None
         note_content, note_filename = self.get_tagged_note(tag) if tag else self.get_random_tech_note()
 
         if not note_content or not note_filename:
@@ -54,18 +110,9 @@ class NoteManager:
         Returns
         -------
         bool
-            True if content contains tech-related keywords.
+            True if content mentions an included topic and no avoided one.
         """
-        tech_keywords = [
-            "python",
-            "javascript",
-            "programming",
-            "software",
-            "data",
-            "algorithm",
-            "api",
-        ]
-        return any(keyword in content.lower() for keyword in tech_keywords)
+        return self.matcher.match(content).on_topic
 
     def _read_file(self, file_path: Path) -> str | None:
         """Read content from a single file safely.
@@ -86,6 +133,34 @@ class NoteManager:
             self.logger.exception("Error reading file %s", file_path.name)
             return None
 
+    def _pick_note(self, candidates: list[str]) -> tuple[str, str] | tuple[None, None]:
+        """Read a randomly chosen note from ``candidates``, skipping any that can no longer be read.
+
+        Parameters
+        ----------
+        candidates : list[str]
+            Paths of the notes to choose from.
+
+        Returns
+        -------
+        tuple[str, str] | tuple[None, None]
+            Tuple of (note content, filename) if a note was read, (None, None) otherwise.
+        """
+        # Try notes that were never posted from first, then fall back to the rest
+        unposted, posted = [], []
+        for path in candidates:
+            (posted if self.is_posted(path) else unposted).append(path)
+        for remaining in (unposted, posted):
+            while remaining:
+                i = random.randrange(len(remaining))  # noqa: S311
+                remaining[i], remaining[-1] = remaining[-1], remaining[i]
+                file_path = Path(remaining.pop())
+                content = self._read_file(file_path)
+                if content is not None:
+                    self.current_note = file_path
+                    return self.md.convert(content), file_path.name
+        return None, None
+
     def get_random_tech_note(self) -> tuple[str, str] | tuple[None, None]:
         """Get a random tech-related note.
 
@@ -94,14 +169,14 @@ class NoteManager:
         tuple[str, str] | tuple[None, None]
             Tuple of (note content, filename) if found, (None, None) if not found.
         """
-        md_files = list(self.notes_directory.glob("*.md"))
-        shuffle(md_files)
-
-        for file_path in md_files:
+        while (path := self.sampler.sample()) is not None:
+            file_path = Path(path)
             content = self._read_file(file_path)
-            if content is not None and self.is_tech_related(content):
+            if content is not None:
                 self.logger.info("Found tech-related note: %s", file_path.name)
+                self.current_note = file_path
                 return self.md.convert(content), file_path.name
+            self.sampler.discard(path)
 
         self.logger.warning("No tech-related notes found")
         return None, None
@@ -119,15 +194,7 @@ class NoteManager:
         tuple[str, str] | tuple[None, None]
             Tuple of (note content, filename) if found, (None, None) if not found.
         """
-        md_files = list(self.notes_directory.glob("*.md"))
-        shuffle(md_files)
-
-        for file_path in md_files:
-            content = self._read_file(file_path)
-            if content is not None and f"#{tag}" in content.lower():
-                return self.md.convert(content), file_path.name
-
-        return None, None
+        return self._pick_note(self.index.tagged(tag))
 
     def get_tech_note_title(self, content: str) -> str:
         """Extract title from note content.
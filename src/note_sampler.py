@@ -0,0 +1,151 @@
+import math
+import random
+import time
+from collections.abc import Callable, Hashable
+
+from config import SamplingConfig
+from note_index import NoteEntry, NoteIndex
+
+
+# Notes longer than this many characters get the full length weight
+FULL_LENGTH = 2000
+
+
+class WeightedSampler:
+    """Draws keys with probability proportional to their weight.
+
+    Weights live in a Fenwick tree, so setting or removing one key and drawing a
+    sample are O(log n), and a changed weight never requires rebuilding the whole
+    table. Slots of removed keys are reused by later insertions.
+    """
+
+    def __init__(self, rng: random.Random | None = None) -> None:
+        self.rng = rng or random.Random()  # noqa: S311
+        self._tree = [0.0]  # 1-based Fenwick tree
+        self._weights: list[float] = []
+        self._keys: list[Hashable | None] = []
+        self._slots: dict[Hashable, int] = {}
+        self._free: list[int] = []
+
+    def __len__(self) -> int:
+        return len(self._slots)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._slots
+
+    @property
+    def total(self) -> float:
+        return self._prefix(len(self._weights))
+
+    def _prefix(self, i: int) -> float:
+        total = 0.0
+        while i > 0:
+            total += self._tree[i]
+            i &= i - 1
+        return total
+
+    def _add(self, slot: int, delta: float) -> None:
+        i = slot + 1
+        while i < len(self._tree):
+            self._tree[i] += delta
+            i += i & -i
+
+    def set(self, key: Hashable, weight: float) -> None:
+        """Insert ``key`` or change its weight; a weight of zero or less removes it."""
+        if weight <= 0:
+            self.remove(key)
+            return
+
+        slot = self._slots.get(key)
+        if slot is None and self._free:
+            slot = self._free.pop()
+            self._slots[key] = slot
+            self._keys[slot] = key
+        if slot is not None:
+            self._add(slot, weight - self._weights[slot])
+            self._weights[slot] = weight
+            return
+
+        # Append a slot: its node covers the range ending at it, so it is built from prefix sums
+        slot = len(self._weights)
+        i = slot + 1
+        self._tree.append(weight + self._prefix(i - 1) - self._prefix(i - (i & -i)))
+        self._weights.append(weight)
+        self._keys.append(key)
+        self._slots[key] = slot
+
+    def remove(self, key: Hashable) -> None:
+        slot = self._slots.pop(key, None)
+        if slot is None:
+            return
+        self._add(slot, -self._weights[slot])
+        self._weights[slot] = 0.0
+        self._keys[slot] = None
+        self._free.append(slot)
+
+    def sample(self) -> Hashable | None:
+        """Draw one key, or None if there are none with a positive weight."""
+        n = len(self._weights)
+        total = self.total
+        if not self._slots or total <= 0:
+            return None
+
+        target = self.rng.random() * total
+        pos = 0
+        step = 1 << (n.bit_length() - 1)
+        while step:
+            nxt = pos + step
+            if nxt <= n and self._tree[nxt] <= target:
+                pos = nxt
+                target -= self._tree[nxt]
+            step >>= 1
+
+        # Floating-point drift can land just past the last key or on an emptied slot
+        if pos >= n or self._keys[pos] is None:
+            return self.rng.choices(list(self._slots), weights=[self._weights[s] for s in self._slots.values()])[0]
+        return self._keys[pos]
+
+
+def note_weight(entry: NoteEntry, weights: SamplingConfig, now: float, *, posted: bool = False) -> float:
+    """Return the selection weight of an on-topic note; zero for notes that should never be picked.
+
+    Each feature is scaled to [0, 1] before its configured weight is applied, and a
+    small floor keeps every on-topic note reachable.
+    """
+    if not entry.on_topic:
+        return 0.0
+
+    topic = 1 - 1 / (1 + sum(entry.topic_hits.values()))
+    age_days = max(0.0, now - entry.mtime) / 86400
+    recency = math.pow(0.5, age_days / weights.recency_half_life_days)
+    length = min(entry.length / FULL_LENGTH, 1.0)
+
+    weight = 0.01 + weights.topic * topic + weights.recency * recency + weights.length * length
+    return weight * (weights.posted_factor if posted else 1.0)
+
+
+class NoteSampler:
+    """Weighted random choice among the on-topic notes of a ``NoteIndex``."""
+
+    def __init__(
+        self,
+        index: NoteIndex,
+        weights: SamplingConfig,
+        is_posted: Callable[[str], bool] | None = None,
+        rng: random.Random | None = None,
+    ) -> None:
+        self.index = index
+        self.weights = weights
+        self.is_posted = is_posted or (lambda _path: False)
+        self._sampler = WeightedSampler(rng)
+
+        now = time.time()
+        for path, entry in index.entries.items():
+            self._sampler.set(path, note_weight(entry, weights, now, posted=self.is_posted(path)))
+
+    def discard(self, path: str) -> None:
+        """Stop offering ``path``, e.g. because it can no longer be read."""
+        self._sampler.remove(path)
+
+    def sample(self) -> str | None:
+        return self._sampler.sample()
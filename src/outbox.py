@@ -0,0 +1,348 @@
+import hashlib
+import json
+import random
+import sqlite3
+import threading
+import time
+from collections import defaultdict
+from collections.abc import Callable, Iterable, Sequence
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any
+
+from config import OutboxConfig
+from social_media import post_to_platforms
+from utils import get_logger
+
+
+logger = get_logger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS posts (
+    id INTEGER PRIMARY KEY,
+    idempotency_key TEXT NOT NULL UNIQUE,
+    content TEXT NOT NULL,
+    note_path TEXT,
+    note_hash TEXT,
+    created_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS deliveries (
+    post_id INTEGER NOT NULL REFERENCES posts (id),
+    platform TEXT NOT NULL,
+    status TEXT NOT NULL CHECK (status IN ('pending', 'sending', 'sent', 'failed')),
+    attempts INTEGER NOT NULL DEFAULT 0,
+    next_attempt_at REAL NOT NULL,
+    last_error TEXT,
+    sent_at REAL,
+    PRIMARY KEY (post_id, platform)
+);
+CREATE INDEX IF NOT EXISTS deliveries_due ON deliveries (status, next_attempt_at);
+"""
+
+
+def idempotency_key(content: str, note_path: str | None) -> str:
+    """Key identifying one approved post, so approving the same text for the same note twice queues it once."""
+    return hashlib.blake2b(json.dumps([content, note_path]).encode(), digest_size=16).hexdigest()
+
+
+@dataclass
+class Delivery:
+    post_id: int
+    platform: str
+    content: str
+    note_path: str | None
+    note_hash: str | None
+    attempts: int
+
+
+class Outbox:
+    """Durable queue of approved posts, with a delivery status per platform.
+
+    Approving a post only inserts rows here; ``OutboxWorker`` does the network calls.
+    A delivery is claimed (``sending``) before it is attempted and marked ``sent`` or
+    rescheduled afterwards. Deliveries still ``sending`` when the outbox is opened
+    were interrupted by a crash and go back to ``pending``, so delivery is at least
+    once: a crash between the platform accepting a post and it being marked sent
+    can repeat that one post.
+    """
+
+    def __init__(self, path: Path) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+        if "sent_at" not in {row[1] for row in self._conn.execute("PRAGMA table_info(deliveries)")}:
+            self._conn.execute("ALTER TABLE deliveries ADD COLUMN sent_at REAL")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS deliveries_sent ON deliveries (platform, sent_at)")
+        with self._conn:
+            resumed = self._conn.execute("UPDATE deliveries SET status = 'pending' WHERE status = 'sending'").rowcount
+        if resumed:
+            logger.warning("Resuming %d deliveries interrupted by a previous run", resumed)
+
+    def close(self) -> None:
+        self._conn.close()
+
+    def enqueue(
+        self,
+        content: str,
+        platforms: Iterable[str],
+        note_path: str | Path | None = None,
+        note_hash: str | None = None,
+    ) -> int:
+        """Queue ``content`` for ``platforms`` and return the post id; re-queuing the same post is a no-op."""
+        note_path = str(note_path) if note_path is not None else None
+        key = idempotency_key(content, note_path)
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR IGNORE INTO posts (idempotency_key, content, note_path, note_hash, created_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (key, content, note_path, note_hash, now),
+            )
+            (post_id,) = self._conn.execute("SELECT id FROM posts WHERE idempotency_key = ?", (key,)).fetchone()
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO deliveries (post_id, platform, status, next_attempt_at) "
+                "VALUES (?, ?, 'pending', ?)",
+                [(post_id, platform, now) for platform in platforms],
+            )
+        return post_id
+
+    def claim_due(self, platforms: Sequence[str], now: float, limit: int | None = None) -> list[Delivery]:
+        """Mark deliveries due by ``now`` on ``platforms`` (up to ``limit``, oldest first) as being sent."""
+        if not platforms:
+            return []
+        placeholders = ",".join("?" * len(platforms))
+        with self._lock, self._conn:
+            rows = self._conn.execute(
+                f"""
+                SELECT d.post_id, d.platform, p.content, p.note_path, p.note_hash, d.attempts
+                FROM deliveries d JOIN posts p ON p.id = d.post_id
+                WHERE d.status = 'pending' AND d.next_attempt_at <= ? AND d.platform IN ({placeholders})
+                ORDER BY d.next_attempt_at
+                LIMIT ?
+                """,  # noqa: S608 (only placeholders are interpolated)
+                (now, *platforms, -1 if limit is None else limit),
+            ).fetchall()
+            self._conn.executemany(
+                "UPDATE deliveries SET status = 'sending' WHERE post_id = ? AND platform = ?",
+                [(row[0], row[1]) for row in rows],
+            )
+        return [Delivery(*row) for row in rows]
+
+    def mark_sent(self, delivery: Delivery) -> None:
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE deliveries SET status = 'sent', attempts = attempts + 1, last_error = NULL, sent_at = ? "
+                "WHERE post_id = ? AND platform = ?",
+                (time.time(), delivery.post_id, delivery.platform),
+            )
+
+    def mark_failed(self, delivery: Delivery, error: str, retry_at: float | None) -> None:
+        """Record a failed attempt; reschedule it for ``retry_at``, or give up on it when that is None."""
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE deliveries SET status = ?, attempts = attempts + 1, last_error = ?, next_attempt_at = ? "
+                "WHERE post_id = ? AND platform = ?",
+                (
+                    "pending" if retry_at is not None else "failed",
+                    error,
+                    retry_at if retry_at is not None else time.time(),
+                    delivery.post_id,
+                    delivery.platform,
+                ),
+            )
+
+    def next_due_at(self, platforms: Sequence[str]) -> float | None:
+        """When the earliest pending delivery on ``platforms`` becomes due, or None if there is none."""
+        if not platforms:
+            return None
+        placeholders = ",".join("?" * len(platforms))
+        with self._lock:
+            (due,) = self._conn.execute(
+                f"""
+                SELECT min(next_attempt_at) FROM deliveries
+                WHERE status = 'pending' AND platform IN ({placeholders})
+                """,  # noqa: S608 (only placeholders are interpolated)
+                tuple(platforms),
+            ).fetchone()
+        return due
+
+    def defer(self, delivery: Delivery, until: float) -> None:
+        """Put a claimed delivery back until ``until`` without counting it as an attempt."""
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE deliveries SET status = 'pending', next_attempt_at = ? WHERE post_id = ? AND platform = ?",
+                (until, delivery.post_id, delivery.platform),
+            )
+
+    def pending_count(self, platform: str) -> int:
+        """How many deliveries on ``platform`` are still waiting to be sent."""
+        with self._lock:
+            (count,) = self._conn.execute(
+                "SELECT count(*) FROM deliveries WHERE platform = ? AND status = 'pending'",
+                (platform,),
+            ).fetchone()
+        return count
+
+    def sent_since(self, platform: str, since: float) -> int:
+        """How many posts went out on ``platform`` since the ``since`` timestamp."""
+        with self._lock:
+            (count,) = self._conn.execute(
+                "SELECT count(*) FROM deliveries WHERE platform = ? AND sent_at >= ?",
+                (platform, since),
+            ).fetchone()
+        return count
+
+
+class OutboxWorker:
+    """Background thread that sends due outbox deliveries through the configured posters.
+
+    All platforms due for one post are sent concurrently. A failed delivery is retried
+    with jittered exponential backoff until ``max_attempts`` is reached, after which it
+    stays in the outbox as ``failed``. ``on_sent`` is called for each delivery that
+    went through.
+
+    Sends respect each poster's ``rate_limiter``: only as many deliveries are claimed
+    as the platform has tokens for, and the worker sleeps until the next token when
+    that is what due posts are waiting on. A post the platform rejected for its rate
+    limit is put back until the reported reset, without using up an attempt.
+    """
+
+    def __init__(
+        self,
+        outbox: Outbox,
+        posters: Sequence[tuple[str, Any]],
+        config: OutboxConfig,
+        on_sent: Callable[[Delivery], None] | None = None,
+    ) -> None:
+        self.outbox = outbox
+        self.posters = dict(posters)
+        self.limiters = {name: poster.rate_limiter for name, poster in posters}
+        self.config = config
+        self.on_sent = on_sent
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._idle = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="outbox", daemon=True)
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def notify(self) -> None:
+        """Wake the worker, e.g. right after a post was queued."""
+        self._idle.clear()
+        self._wake.set()
+
+    def stop(self, drain_timeout: float = 0.0) -> None:
+        """Stop the worker, first waiting up to ``drain_timeout`` seconds for due deliveries to be sent."""
+        if not self._thread.is_alive():
+            return
+        if drain_timeout > 0:
+            self._idle.wait(drain_timeout)
+        self.log_stats()
+        if self.outbox.next_due_at(list(self.posters)) is not None:
+            logger.warning("Outbox still has unsent posts; they will be retried on the next run")
+        self._stop.set()
+        self._wake.set()
+        self._thread.join()
+
+    def _claim(self, now: float) -> list[Delivery]:
+        deliveries = []
+        for platform, limiter in self.limiters.items():
+            if tokens := limiter.available(now):
+                deliveries += self.outbox.claim_due([platform], now, limit=tokens)
+        return deliveries
+
+    def _next_wake(self, now: float) -> float | None:
+        wake = None
+        for platform, limiter in self.limiters.items():
+            due = self.outbox.next_due_at([platform])
+            if due is None:
+                continue
+            if due <= now:
+                # Due but not claimed: waiting for a rate limit token
+                limiter.mark_blocked(now)
+                due = limiter.next_token_at(now)
+            wake = due if wake is None else min(wake, due)
+        return wake
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            self._wake.clear()
+            try:
+                now = time.time()
+                deliveries = self._claim(now)
+                if deliveries:
+                    self.send(deliveries)
+                    continue
+                next_due = self._next_wake(now)
+            except Exception:
+                logger.exception("Outbox worker error")
+                next_due = time.time() + self.config.retry_base_seconds
+
+            self._idle.set()
+            timeout = None if next_due is None else max(0.0, next_due - time.time())
+            self._wake.wait(timeout)
+
+    def send(self, deliveries: list[Delivery]) -> None:
+        """Send claimed deliveries now, marking each sent or rescheduling it."""
+        by_post: dict[int, list[Delivery]] = defaultdict(list)
+        for delivery in deliveries:
+            by_post[delivery.post_id].append(delivery)
+
+        for post_deliveries in by_post.values():
+            content = post_deliveries[0].content
+            ready = []
+            for delivery in post_deliveries:
+                limiter = self.limiters[delivery.platform]
+                if limiter.blocked_until > time.time():
+                    # Rate limited by an earlier post in this batch
+                    self.outbox.defer(delivery, limiter.blocked_until)
+                    continue
+                limiter.take()
+                ready.append(delivery)
+            results = post_to_platforms([(d.platform, self.posters[d.platform]) for d in ready], content)
+            for delivery in ready:
+                limiter = self.limiters[delivery.platform]
+                if results[delivery.platform]:
+                    self.outbox.mark_sent(delivery)
+                    if self.on_sent is not None:
+                        self.on_sent(delivery)
+                elif limiter.blocked_until > time.time():
+                    self.outbox.defer(delivery, limiter.blocked_until)
+                else:
+                    self._reschedule(delivery)
+
+    def _reschedule(self, delivery: Delivery) -> None:
+        attempts = delivery.attempts + 1
+        if attempts >= self.config.max_attempts:
+            logger.error("Giving up on post %d for %s after %d attempts", delivery.post_id, delivery.platform, attempts)
+            self.outbox.mark_failed(delivery, "post failed", None)
+            return
+        delay = min(self.config.retry_max_seconds, self.config.retry_base_seconds * 2 ** (attempts - 1))
+        delay *= random.uniform(0.5, 1.0)  # noqa: S311
+        logger.warning("Post %d to %s failed, retrying in %.0fs", delivery.post_id, delivery.platform, delay)
+        self.outbox.mark_failed(delivery, "post failed", time.time() + delay)
+
+    def metrics(self) -> dict[str, dict[str, float]]:
+        """Rate limit metrics per platform: time blocked waiting for tokens, 429s received, queue depth."""
+        return {
+            platform: {
+                "blocked_seconds": limiter.blocked_seconds,
+                "throttled": limiter.throttled,
+                "queued": self.outbox.pending_count(platform),
+            }
+            for platform, limiter in self.limiters.items()
+        }
+
+    def log_stats(self) -> None:
+        for platform, metrics in self.metrics().items():
+            logger.info(
+                "%s: %.0fs blocked by the rate limit, %d rate-limited responses, %d posts queued",
+                platform,
+                metrics["blocked_seconds"],
+                metrics["throttled"],
+                metrics["queued"],
+            )
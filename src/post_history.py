@@ -0,0 +1,156 @@
+import hashlib
+import math
+import sqlite3
+import threading
+import time
+from collections.abc import Iterable
+from pathlib import Path
+
+from utils import get_logger
+
+
+logger = get_logger(__name__)
+
+BLOOM_FALSE_POSITIVE_RATE = 0.01
+INITIAL_BLOOM_CAPACITY = 10_000
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS posts (
+    id INTEGER PRIMARY KEY,
+    posted_at REAL NOT NULL,
+    note_path TEXT,
+    note_hash TEXT,
+    text TEXT NOT NULL,
+    text_hash TEXT NOT NULL,
+    platforms TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS posts_note_path ON posts (note_path);
+CREATE INDEX IF NOT EXISTS posts_note_hash ON posts (note_hash);
+CREATE INDEX IF NOT EXISTS posts_text_hash ON posts (text_hash);
+CREATE TABLE IF NOT EXISTS bloom (
+    id INTEGER PRIMARY KEY CHECK (id = 1),
+    capacity INTEGER NOT NULL,
+    bits BLOB NOT NULL
+);
+"""
+
+
+def text_digest(text: str) -> str:
+    """Digest of generated text, ignoring case and whitespace differences."""
+    return hashlib.blake2b(" ".join(text.lower().split()).encode(), digest_size=16).hexdigest()
+
+
+class BloomFilter:
+    """Fixed-size Bloom filter over strings, sized for ``capacity`` items at the target false-positive rate."""
+
+    def __init__(self, capacity: int, bits: bytes | None = None) -> None:
+        self.capacity = capacity
+        self.size = max(8, math.ceil(-capacity * math.log(BLOOM_FALSE_POSITIVE_RATE) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray(bits) if bits is not None else bytearray(-(-self.size // 8))
+
+    def _positions(self, item: str) -> Iterable[int]:
+        # Kirsch-Mitzenmacher double hashing: two 64-bit hashes stand in for k independent ones
+        raw = hashlib.blake2b(item.encode(), digest_size=16).digest()
+        h1, h2 = int.from_bytes(raw[:8], "little"), int.from_bytes(raw[8:], "little") | 1
+        return ((h1 + i * h2) % self.size for i in range(self.hashes))
+
+    def add(self, item: str) -> None:
+        for pos in self._positions(item):
+            self.bits[pos >> 3] |= 1 << (pos & 7)
+
+    def __contains__(self, item: str) -> bool:
+        return all(self.bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(item))
+
+
+class PostHistory:
+    """Local record of what has already been posted.
+
+    Every post is a row in SQLite (note path, note content hash, text, platforms).
+    Membership checks go through a Bloom filter first, so the common "never posted"
+    answer costs a few hash probes and no query; only probable hits are confirmed
+    with an indexed lookup. The filter is persisted as a single blob, so opening the
+    history reads a fixed amount of data however many posts it holds.
+    """
+
+    def __init__(self, path: Path) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(SCHEMA)
+
+        row = self._conn.execute("SELECT capacity, bits FROM bloom WHERE id = 1").fetchone()
+        self._count = self._conn.execute("SELECT count(*) FROM posts").fetchone()[0]
+        if row is None:
+            self._rebuild_bloom(INITIAL_BLOOM_CAPACITY)
+        else:
+            self._bloom = BloomFilter(row[0], row[1])
+
+    def close(self) -> None:
+        self._conn.close()
+
+    def _rebuild_bloom(self, capacity: int) -> None:
+        self._bloom = BloomFilter(capacity)
+        for note_path, note_hash, text_hash in self._conn.execute("SELECT note_path, note_hash, text_hash FROM posts"):
+            self._add_keys(note_path, note_hash, text_hash)
+        self._save_bloom()
+        logger.info("Rebuilt post history filter for %d posts (capacity %d)", self._count, capacity)
+
+    def _save_bloom(self) -> None:
+        with self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO bloom (id, capacity, bits) VALUES (1, ?, ?)",
+                (self._bloom.capacity, bytes(self._bloom.bits)),
+            )
+
+    def _add_keys(self, note_path: str | None, note_hash: str | None, text_hash: str) -> None:
+        if note_path:
+            self._bloom.add(f"path:{note_path}")
+        if note_hash:
+            self._bloom.add(f"note:{note_hash}")
+        self._bloom.add(f"text:{text_hash}")
+
+    def _seen(self, key: str, column: str, value: str) -> bool:
+        if key not in self._bloom:
+            return False
+        with self._lock:
+            query = f"SELECT 1 FROM posts WHERE {column} = ? LIMIT 1"  # noqa: S608 (column is not user input)
+            return self._conn.execute(query, (value,)).fetchone() is not None
+
+    def has_note(self, note_path: str | Path) -> bool:
+        """Whether a post was already made from the note at ``note_path``."""
+        return self._seen(f"path:{note_path}", "note_path", str(note_path))
+
+    def has_note_hash(self, note_hash: str) -> bool:
+        """Whether a post was already made from a note with this content hash, wherever it lives now."""
+        return self._seen(f"note:{note_hash}", "note_hash", note_hash)
+
+    def has_text(self, text: str) -> bool:
+        """Whether ``text`` (ignoring case and whitespace) was already posted."""
+        text_hash = text_digest(text)
+        return self._seen(f"text:{text_hash}", "text_hash", text_hash)
+
+    def record(
+        self,
+        text: str,
+        platforms: Iterable[str],
+        note_path: str | Path | None = None,
+        note_hash: str | None = None,
+    ) -> None:
+        """Remember a post made on ``platforms`` from the given note."""
+        note_path = str(note_path) if note_path is not None else None
+        text_hash = text_digest(text)
+        with self._lock:
+            with self._conn:
+                self._conn.execute(
+                    "INSERT INTO posts (posted_at, note_path, note_hash, text, text_hash, platforms) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    (time.time(), note_path, note_hash, text, text_hash, ",".join(platforms)),
+                )
+            self._count += 1
+            if self._count > self._bloom.capacity:
+                self._rebuild_bloom(self._bloom.capacity * 2)
+            else:
+                self._add_keys(note_path, note_hash, text_hash)
+                self._save_bloom()
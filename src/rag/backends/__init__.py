@@ -0,0 +1,46 @@
+from config import Config
+
+from .base import SimilarityConfig, StorageBackend, WriteBatch
+
+
+def create_backend(config: Config) -> StorageBackend:
+    """Create the storage backend selected by ``knowledge_base.database.type``.
+
+    Parameters
+    ----------
+    config : Config
+        The loaded configuration.
+
+    Returns
+    -------
+    StorageBackend
+        A Neo4j-server backed store for ``"neo4j"``, or the embedded store for ``"sqlite"``.
+
+    Raises
+    ------
+    ValueError
+        If the configured backend type is unknown.
+    """
+    kb_config = config.knowledge_base
+    embedding_config = kb_config.embedding
+    similarity = SimilarityConfig(
+        index_name=kb_config.vector_index.name,
+        # Both backends score cosine similarity on the vector index's (1 + cos) / 2 scale
+        threshold=(1 + embedding_config.similarity_threshold) / 2,
+        top_k=embedding_config.similar_top_k,
+        max_edges=embedding_config.max_similar_edges,
+    )
+
+    backend_type = kb_config.database.type
+    # Imported here so only the selected backend's driver has to be installed
+    if backend_type == "neo4j":
+        from .neo4j_backend import Neo4jBackend  # noqa: PLC0415
+
+        return Neo4jBackend(kb_config, similarity)
+    if backend_type == "sqlite":
+        from .sqlite_backend import SQLiteBackend  # noqa: PLC0415
+
+        return SQLiteBackend(config.data_dir / "kb", embedding_config.dimension, similarity)
+
+    msg = f"Unknown knowledge base backend: {backend_type!r} (expected 'neo4j' or 'sqlite')"
+    raise ValueError(msg)
@@ -0,0 +1,54 @@
+from abc import ABC, abstractmethod
+from dataclasses import dataclass, field
+from typing import Any
+
+
+@dataclass(frozen=True)
+class SimilarityConfig:
+    index_name: str
+    threshold: float
+    top_k: int
+    max_edges: int
+
+
+@dataclass
+class WriteBatch:
+    """Changes from one or more files, applied by a backend as a single unit."""
+
+    replaced_files: list[str] = field(default_factory=list)
+    removed: list[dict[str, str]] = field(default_factory=list)
+    blocks: list[dict[str, Any]] = field(default_factory=list)
+
+
+class StorageBackend(ABC):
+    """Where the knowledge base keeps blocks, tags, SIMILAR edges and embeddings.
+
+    ``write_batch`` must remove the blocks of ``replaced_files`` and the ``removed``
+    (source_file, hash) pairs together with their edges, upsert ``blocks`` keyed by
+    (source_file, hash) along with their TAGGED edges, and then link the upserted
+    blocks to their nearest neighbours according to the backend's ``SimilarityConfig``.
+    Text repeated across files is stored once per file; lookups return each distinct
+    text once.
+    """
+
+    @abstractmethod
+    def setup(self) -> None:
+        """Create schema, constraints and indexes if they do not exist yet."""
+
+    @abstractmethod
+    def write_batch(self, batch: WriteBatch) -> None: ...
+
+    @abstractmethod
+    def search(self, embedding: list[float], limit: int, tags: list[str] | None = None) -> list[dict[str, Any]]:
+        """Return the ``limit`` blocks closest to ``embedding`` as dicts with content, score and tags."""
+
+    @abstractmethod
+    def related_concepts(self, tag: str, limit: int = 10) -> list[dict[str, Any]]:
+        """Return blocks SIMILAR to blocks tagged ``tag``, most connected first."""
+
+    @abstractmethod
+    def explore(self, start_content: str, max_depth: int) -> list[dict[str, Any]]:
+        """Return blocks reachable from ``start_content`` over SIMILAR/TAGGED edges, nearest first."""
+
+    @abstractmethod
+    def close(self) -> None: ...
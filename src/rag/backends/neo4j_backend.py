@@ -0,0 +1,255 @@
+import time
+from collections.abc import Callable
+from typing import Any, TypeVar
+
+from neo4j import GraphDatabase, ManagedTransaction, Session
+from neo4j.exceptions import ServiceUnavailable, SessionExpired, TransientError
+
+from config import KnowledgeBaseConfig
+from utils import get_logger
+
+from .base import SimilarityConfig, StorageBackend, WriteBatch
+
+
+logger = get_logger(__name__)
+
+RETRYABLE_ERRORS = (TransientError, ServiceUnavailable, SessionExpired)
+RETRY_BASE_DELAY = 0.5
+
+_P = TypeVar("_P")
+
+
+class Neo4jBackend(StorageBackend):
+    """Knowledge base stored in a Neo4j server.
+
+    Each batch is written in one ``execute_write`` transaction of UNWIND statements,
+    retried up to ``max_retries`` times on transient errors. Deleted blocks lose their
+    SIMILAR edges with the ``DETACH DELETE`` in that transaction. Once it commits, only
+    the blocks it upserted are looked up in the vector index for their nearest
+    neighbours, so similarity edges are maintained incrementally instead of by
+    comparing every pair of blocks.
+
+    Blocks are keyed by ``(source_file, hash)``, so text that appears in several files
+    is stored once per file and deleting it from one file leaves the others intact.
+    Lookups return each distinct text once.
+    """
+
+    def __init__(self, kb_config: KnowledgeBaseConfig, similarity: SimilarityConfig) -> None:
+        self.kb_config = kb_config
+        self.similarity = similarity
+        self.max_retries = max(0, kb_config.processing.max_retries)
+
+        db_config = kb_config.database
+        self.driver = GraphDatabase.driver(
+            db_config.uri,
+            auth=(db_config.user, db_config.password),
+            # Retries are done by write_batch, bounded by processing.max_retries
+            max_transaction_retry_time=0,
+        )
+
+    def close(self) -> None:
+        self.driver.close()
+
+    def setup(self) -> None:
+        with self.driver.session() as session:
+            self._drop_content_key(session)
+            session.run(
+                "CREATE CONSTRAINT block_key IF NOT EXISTS FOR (b:Block) REQUIRE (b.source_file, b.hash) IS UNIQUE",
+            )
+
+            # Create configurable constraints
+            for constraint in self.kb_config.constraints:
+                if (constraint.node, constraint.property) == ("Block", "content"):
+                    logger.warning("Skipping constraint %s: the same text may appear in several files", constraint.name)
+                    continue
+                session.run(f"""
+                    CREATE CONSTRAINT {constraint.name} IF NOT EXISTS
+                    FOR (b:{constraint.node}) REQUIRE b.{constraint.property} IS UNIQUE
+                """)
+
+            # Lookup indexes for the incremental deletes done by write_batch
+            for prop in ("hash", "source_file", "content"):
+                session.run(f"CREATE INDEX block_{prop} IF NOT EXISTS FOR (b:Block) ON (b.{prop})")
+
+            # Create vector index from config
+            vector_idx = self.kb_config.vector_index
+            session.run(f"""
+                CREATE VECTOR INDEX {vector_idx.name} IF NOT EXISTS
+                FOR (b:{vector_idx.node}) ON (b.{vector_idx.property})
+                OPTIONS {{indexConfig: {{
+                    `vector.dimensions`: {self.kb_config.embedding.dimension},
+                    `vector.similarity_function`: '{vector_idx.algorithm}'
+                }}}}
+            """)
+
+    @staticmethod
+    def _drop_content_key(session: Session) -> None:
+        """Drop the uniqueness constraint on Block.content from older versions, with the blocks it shaped."""
+        result = session.run(
+            """
+            SHOW CONSTRAINTS YIELD name, labelsOrTypes, properties
+            WHERE labelsOrTypes = ['Block'] AND properties = ['content']
+            RETURN name
+            """,
+        )
+        names = [record["name"] for record in result]
+        if not names:
+            return
+        # The sync manifest was versioned along with this, so every file is synced again
+        logger.warning("Knowledge base store keys blocks by content; clearing it for a full re-sync")
+        for name in names:
+            session.run(f"DROP CONSTRAINT {name} IF EXISTS")
+        session.run("MATCH (b:Block) CALL { WITH b DETACH DELETE b } IN TRANSACTIONS OF 10000 ROWS")
+
+    def write_batch(self, batch: WriteBatch) -> None:
+        self._execute_with_retries(self._write_batch, batch)
+        if batch.blocks:
+            unique_keys = {(block["source_file"], block["hash"]) for block in batch.blocks}
+            keys = [{"source_file": file, "hash": digest} for file, digest in unique_keys]
+            self._execute_with_retries(self._link_similar, keys)
+
+    def _execute_with_retries(self, work: Callable[[ManagedTransaction, _P], None], payload: _P) -> None:
+        for attempt in range(self.max_retries + 1):
+            try:
+                with self.driver.session() as session:
+                    session.execute_write(work, payload)
+            except RETRYABLE_ERRORS:  # noqa: PERF203
+                if attempt == self.max_retries:
+                    raise
+                delay = RETRY_BASE_DELAY * 2**attempt
+                logger.warning("Transient Neo4j error, retrying batch in %.1fs", delay, exc_info=True)
+                time.sleep(delay)
+            else:
+                return
+
+    @staticmethod
+    def _write_batch(tx: ManagedTransaction, batch: WriteBatch) -> None:
+        if batch.replaced_files:
+            tx.run(
+                """
+                UNWIND $files as file
+                MATCH (b:Block)
+                WHERE b.source_file = file
+                DETACH DELETE b
+                """,
+                {"files": batch.replaced_files},
+            )
+        if batch.removed:
+            tx.run(
+                """
+                UNWIND $removed as row
+                MATCH (b:Block {source_file: row.source_file, hash: row.hash})
+                DETACH DELETE b
+                """,
+                {"removed": batch.removed},
+            )
+        if batch.blocks:
+            tx.run(
+                """
+                UNWIND $blocks as block
+                MERGE (b:Block {source_file: block.source_file, hash: block.hash})
+                SET b.embedding = block.embedding,
+                    b.content = block.content,
+                    b.level = block.level,
+                    b.last_modified = block.last_modified,
+                    b.file_size = block.file_size
+                WITH b, block
+                UNWIND block.tags as tag
+                MERGE (t:Tag {name: tag})
+                MERGE (b)-[:TAGGED]->(t)
+                """,
+                {"blocks": batch.blocks},
+            )
+
+    def _link_similar(self, tx: ManagedTransaction, keys: list[dict[str, str]]) -> None:
+        """Connect each given block to its top-k neighbours above the similarity threshold."""
+        tx.run(
+            """
+            UNWIND $keys as key
+            MATCH (b:Block {source_file: key.source_file, hash: key.hash})
+            CALL db.index.vector.queryNodes($index_name, $top_k + 1, b.embedding)
+            YIELD node, score
+            WITH b, node, score
+            // The same text in another file is not a related concept
+            WHERE node.content <> b.content
+              AND score >= $threshold
+              AND COUNT { (node)-[:SIMILAR]-() } < $max_edges
+            WITH b, node, score
+            ORDER BY score DESC
+            WITH b, collect({node: node, score: score})[..$max_edges] as neighbours
+            UNWIND neighbours as neighbour
+            WITH b, neighbour.node as other, neighbour.score as score
+            MERGE (b)-[r:SIMILAR]-(other)
+            SET r.score = score
+            """,
+            {
+                "keys": keys,
+                "index_name": self.similarity.index_name,
+                "top_k": self.similarity.top_k,
+                "threshold": self.similarity.threshold,
+                "max_edges": self.similarity.max_edges,
+            },
+        )
+
+    def search(self, embedding: list[float], limit: int, tags: list[str] | None = None) -> list[dict[str, Any]]:
+        with self.driver.session() as session:
+            result = session.run(
+                """
+                CALL db.index.vector.queryNodes($index_name, $candidates, $embedding)
+                YIELD node, score
+                OPTIONAL MATCH (node)-[:TAGGED]->(t:Tag)
+                WITH node, score, collect(t.name) as tags
+                WHERE size($tags) = 0 OR any(tag IN tags WHERE tag IN $tags)
+                WITH node.content as content, max(score) as score, head(collect(tags)) as tags
+                RETURN content, score, tags
+                ORDER BY score DESC
+                LIMIT $limit
+                """,
+                {
+                    "index_name": self.similarity.index_name,
+                    # Tag filtering and merging repeated texts happen after the vector lookup,
+                    # so over-fetch candidates
+                    "candidates": limit * 10 if tags else limit * 4,
+                    "embedding": embedding,
+                    "limit": limit,
+                    "tags": tags or [],
+                },
+            )
+            return [dict(record) for record in result]
+
+    def related_concepts(self, tag: str, limit: int = 10) -> list[dict[str, Any]]:
+        with self.driver.session() as session:
+            result = session.run(
+                """
+                MATCH (t:Tag {name: $tag})<-[:TAGGED]-(b:Block)-[:SIMILAR]-(related:Block)
+                WITH related.content as content, collect(related) as blocks, count(*) as relevance
+                UNWIND blocks as related
+                OPTIONAL MATCH (related)-[:TAGGED]->(rt:Tag)
+                RETURN content,
+                       collect(distinct rt.name) as related_tags,
+                       relevance
+                ORDER BY relevance DESC
+                LIMIT $limit
+                """,
+                {"tag": tag, "limit": limit},
+            )
+            return [dict(record) for record in result]
+
+    def explore(self, start_content: str, max_depth: int) -> list[dict[str, Any]]:
+        with self.driver.session() as session:
+            # Variable-length bounds cannot be query parameters
+            result = session.run(
+                f"""
+                MATCH path = (start:Block {{content: $content}})-[:SIMILAR|TAGGED*1..{int(max_depth)}]-(related:Block)
+                WHERE related.content <> $content
+                WITH related.content as content, path
+                ORDER BY length(path)
+                WITH content, head(collect(path)) as path
+                RETURN content,
+                       [r in relationships(path) | type(r)] as connection_types,
+                       length(path) as distance
+                ORDER BY distance
+                """,
+                {"content": start_content},
+            )
+            return [dict(record) for record in result]
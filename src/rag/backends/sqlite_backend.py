@@ -0,0 +1,369 @@
+import sqlite3
+import threading
+from collections import deque
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+
+from utils import get_logger
+
+from .base import SimilarityConfig, StorageBackend, WriteBatch
+
+
+logger = get_logger(__name__)
+
+INITIAL_ROWS = 1024
+SIMILARITY_CHUNK = 64
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS blocks (
+    id INTEGER PRIMARY KEY,
+    content TEXT NOT NULL,
+    hash TEXT NOT NULL,
+    level INTEGER NOT NULL,
+    source_file TEXT NOT NULL,
+    last_modified REAL,
+    file_size INTEGER,
+    vector_row INTEGER NOT NULL UNIQUE
+);
+CREATE UNIQUE INDEX IF NOT EXISTS blocks_key ON blocks (source_file, hash);
+CREATE INDEX IF NOT EXISTS blocks_content ON blocks (content);
+CREATE TABLE IF NOT EXISTS tags (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE
+);
+CREATE TABLE IF NOT EXISTS block_tags (
+    block_id INTEGER NOT NULL REFERENCES blocks (id) ON DELETE CASCADE,
+    tag_id INTEGER NOT NULL REFERENCES tags (id),
+    PRIMARY KEY (block_id, tag_id)
+);
+CREATE INDEX IF NOT EXISTS block_tags_tag ON block_tags (tag_id);
+CREATE TABLE IF NOT EXISTS similar (
+    a INTEGER NOT NULL REFERENCES blocks (id) ON DELETE CASCADE,
+    b INTEGER NOT NULL REFERENCES blocks (id) ON DELETE CASCADE,
+    score REAL NOT NULL,
+    PRIMARY KEY (a, b)
+);
+CREATE INDEX IF NOT EXISTS similar_b ON similar (b);
+"""
+
+
+class SQLiteBackend(StorageBackend):
+    """Embedded knowledge base: SQLite for blocks, tags and edges, a memory-mapped matrix for vectors.
+
+    Blocks are keyed by ``(source_file, hash)``, so text that appears in several files
+    is stored once per file and deleting it from one file leaves the others intact.
+    Lookups return each distinct text once.
+
+    Each block owns one row of a float32 matrix (``vector_row``) holding its unit-length
+    embedding, so nearest-neighbour lookups are an exact matrix-vector product with no
+    server round trip. Scores are reported as ``(1 + cosine) / 2``, the same scale as
+    Neo4j's cosine vector index, so ``similarity_threshold`` means the same for both
+    backends.
+    """
+
+    def __init__(self, directory: Path, dimension: int, similarity: SimilarityConfig) -> None:
+        self.dimension = dimension
+        self.similarity = similarity
+        directory.mkdir(parents=True, exist_ok=True)
+        self._vectors_path = directory / "kb_vectors.f32"
+        self._lock = threading.RLock()
+
+        self._conn = sqlite3.connect(directory / "kb.sqlite3", check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA foreign_keys=ON")
+
+        self._vectors: np.memmap | None = None
+        self._row_ids = np.empty(0, dtype=np.int64)
+        self._free: list[int] = []
+
+    def setup(self) -> None:
+        with self._lock:
+            self._conn.executescript(SCHEMA)
+            rows = self._vectors_path.stat().st_size // (4 * self.dimension) if self._vectors_path.exists() else 0
+            self._open_vectors(rows)
+            self._load_rows()
+
+    def close(self) -> None:
+        with self._lock:
+            if self._vectors is not None:
+                self._vectors.flush()
+            self._conn.close()
+
+    def _open_vectors(self, rows: int) -> None:
+        if self._vectors is not None:
+            self._vectors.flush()
+            self._vectors = None
+        if rows == 0:
+            return
+        with self._vectors_path.open("ab") as file:
+            file.truncate(rows * self.dimension * 4)
+        self._vectors = np.memmap(self._vectors_path, dtype=np.float32, mode="r+", shape=(rows, self.dimension))
+
+    def _load_rows(self) -> None:
+        """Rebuild the row -> block id map from the database."""
+        rows = 0 if self._vectors is None else self._vectors.shape[0]
+        self._row_ids = np.full(rows, -1, dtype=np.int64)
+        for block_id, row in self._conn.execute("SELECT id, vector_row FROM blocks"):
+            self._row_ids[row] = block_id
+        self._free = [int(row) for row in np.flatnonzero(self._row_ids < 0)[::-1]]
+
+    def _allocate_row(self) -> int:
+        if not self._free:
+            old_rows = len(self._row_ids)
+            new_rows = max(old_rows * 2, INITIAL_ROWS)
+            self._open_vectors(new_rows)
+            self._row_ids = np.concatenate([self._row_ids, np.full(new_rows - old_rows, -1, dtype=np.int64)])
+            self._free = list(range(new_rows - 1, old_rows - 1, -1))
+        return self._free.pop()
+
+    def write_batch(self, batch: WriteBatch) -> None:
+        with self._lock:
+            freed: list[int] = []
+            try:
+                with self._conn:
+                    for file in batch.replaced_files:
+                        rows = self._conn.execute(
+                            "SELECT id, vector_row FROM blocks WHERE source_file = ?", (file,),
+                        ).fetchall()
+                        freed.extend(self._delete_blocks(rows))
+                    for removed in batch.removed:
+                        rows = self._conn.execute(
+                            "SELECT id, vector_row FROM blocks WHERE source_file = ? AND hash = ?",
+                            (removed["source_file"], removed["hash"]),
+                        ).fetchall()
+                        freed.extend(self._delete_blocks(rows))
+
+                    upserted = [self._upsert_block(block) for block in batch.blocks]
+                    self._link_similar(upserted)
+            except BaseException:
+                # Row assignments made inside the rolled-back transaction are void
+                self._load_rows()
+                raise
+
+            # Rows of deleted blocks are only reused once their deletion is committed
+            self._free.extend(freed)
+            if self._vectors is not None:
+                self._vectors.flush()
+
+    def _delete_blocks(self, rows: list[tuple[int, int]]) -> list[int]:
+        if not rows:
+            return []
+        self._conn.executemany("DELETE FROM blocks WHERE id = ?", [(block_id,) for block_id, _ in rows])
+        for _, row in rows:
+            self._row_ids[row] = -1
+        return [row for _, row in rows]
+
+    def _upsert_block(self, block: dict[str, Any]) -> tuple[int, int]:
+        existing = self._conn.execute(
+            "SELECT id, vector_row FROM blocks WHERE source_file = ? AND hash = ?",
+            (block["source_file"], block["hash"]),
+        ).fetchone()
+        values = (block["hash"], block["level"], block["source_file"], block["last_modified"], block["file_size"])
+        if existing:
+            block_id, row = existing
+            self._conn.execute(
+                "UPDATE blocks SET content = ?, level = ?, last_modified = ?, file_size = ? WHERE id = ?",
+                (block["content"], block["level"], block["last_modified"], block["file_size"], block_id),
+            )
+        else:
+            row = self._allocate_row()
+            block_id = self._conn.execute(
+                "INSERT INTO blocks (content, hash, level, source_file, last_modified, file_size, vector_row)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (block["content"], *values, row),
+            ).lastrowid
+
+        vector = np.asarray(block["embedding"], dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        self._vectors[row] = vector / norm if norm else vector  # type: ignore[index]
+        self._row_ids[row] = block_id
+
+        for tag in block["tags"]:
+            self._conn.execute("INSERT OR IGNORE INTO tags (name) VALUES (?)", (tag,))
+            self._conn.execute(
+                "INSERT OR IGNORE INTO block_tags (block_id, tag_id) SELECT ?, id FROM tags WHERE name = ?",
+                (block_id, tag),
+            )
+        return block_id, row
+
+    def _scores(self, queries: np.ndarray) -> np.ndarray:
+        """Similarity of each query row against every stored vector; free rows score -inf."""
+        scores = (1 + queries @ self._vectors.T) / 2  # type: ignore[union-attr]
+        scores[:, self._row_ids < 0] = -np.inf
+        return scores
+
+    def _link_similar(self, upserted: list[tuple[int, int]]) -> None:
+        """Connect each upserted block to its top-k neighbours above the similarity threshold."""
+        if not upserted or self._vectors is None:
+            return
+
+        top_k = self.similarity.top_k
+        for start in range(0, len(upserted), SIMILARITY_CHUNK):
+            chunk = upserted[start : start + SIMILARITY_CHUNK]
+            scores = self._scores(np.asarray(self._vectors[[row for _, row in chunk]]))
+            for (block_id, row), row_scores in zip(chunk, scores, strict=True):
+                row_scores[row] = -np.inf
+                k = min(top_k, len(row_scores) - 1)
+                if k <= 0:
+                    continue
+                candidates = np.argpartition(-row_scores, k)[:k]
+                candidates = candidates[np.argsort(-row_scores[candidates])]
+                contents = self._contents_for([block_id, *(int(self._row_ids[other]) for other in candidates)])
+
+                edges = 0
+                for other_row in candidates:
+                    score = float(row_scores[other_row])
+                    if score < self.similarity.threshold or edges >= self.similarity.max_edges:
+                        break
+                    other_id = int(self._row_ids[other_row])
+                    # The same text in another file is not a related concept
+                    if contents.get(other_id) == contents[block_id]:
+                        continue
+                    if self._edge_count(other_id) >= self.similarity.max_edges:
+                        continue
+                    a, b = sorted((block_id, other_id))
+                    self._conn.execute(
+                        "INSERT OR REPLACE INTO similar (a, b, score) VALUES (?, ?, ?)", (a, b, score),
+                    )
+                    edges += 1
+
+    def _edge_count(self, block_id: int) -> int:
+        (count,) = self._conn.execute(
+            "SELECT (SELECT COUNT(*) FROM similar WHERE a = ?) + (SELECT COUNT(*) FROM similar WHERE b = ?)",
+            (block_id, block_id),
+        ).fetchone()
+        return count
+
+    def _contents_for(self, block_ids: list[int]) -> dict[int, str]:
+        if not block_ids:
+            return {}
+        placeholders = ",".join("?" * len(block_ids))
+        query = f"SELECT id, content FROM blocks WHERE id IN ({placeholders})"  # noqa: S608
+        return dict(self._conn.execute(query, block_ids))
+
+    def _tags_for(self, block_ids: list[int]) -> dict[int, list[str]]:
+        tags: dict[int, list[str]] = {block_id: [] for block_id in block_ids}
+        if not block_ids:
+            return tags
+        placeholders = ",".join("?" * len(block_ids))
+        query = (
+            "SELECT bt.block_id, t.name FROM block_tags bt JOIN tags t ON t.id = bt.tag_id"  # noqa: S608
+            f" WHERE bt.block_id IN ({placeholders})"
+        )
+        for block_id, name in self._conn.execute(query, block_ids):
+            tags[block_id].append(name)
+        return tags
+
+    def search(self, embedding: list[float], limit: int, tags: list[str] | None = None) -> list[dict[str, Any]]:
+        with self._lock:
+            if self._vectors is None or limit <= 0:
+                return []
+            query = np.asarray(embedding, dtype=np.float32)
+            norm = np.linalg.norm(query)
+            scores = self._scores((query / norm if norm else query)[None, :])[0]
+
+            if tags:
+                placeholders = ",".join("?" * len(tags))
+                allowed = {
+                    block_id
+                    for (block_id,) in self._conn.execute(
+                        "SELECT bt.block_id FROM block_tags bt JOIN tags t ON t.id = bt.tag_id"  # noqa: S608
+                        f" WHERE t.name IN ({placeholders})",
+                        tags,
+                    )
+                }
+                scores[~np.isin(self._row_ids, list(allowed))] = -np.inf
+
+            # The same text may be stored for several files; widen the candidate set until
+            # it holds ``limit`` distinct texts or every row
+            k = min(limit, len(scores))
+            while True:
+                top = np.argpartition(-scores, k - 1)[:k]
+                top = [int(row) for row in top[np.argsort(-scores[top])] if np.isfinite(scores[row])]
+                ids = [int(self._row_ids[row]) for row in top]
+                contents = self._contents_for(ids)
+                if len(set(contents.values())) >= limit or k == len(scores):
+                    break
+                k = min(k * 4, len(scores))
+
+            block_tags = self._tags_for(ids)
+            results: dict[str, dict[str, Any]] = {}
+            for block_id, row in zip(ids, top, strict=True):
+                if contents[block_id] not in results:
+                    results[contents[block_id]] = {
+                        "content": contents[block_id],
+                        "score": float(scores[row]),
+                        "tags": block_tags[block_id],
+                    }
+            return list(results.values())[:limit]
+
+    def related_concepts(self, tag: str, limit: int = 10) -> list[dict[str, Any]]:
+        with self._lock:
+            rows = self._conn.execute(
+                """
+                WITH tagged AS (
+                    SELECT bt.block_id AS id FROM block_tags bt JOIN tags t ON t.id = bt.tag_id WHERE t.name = ?
+                ),
+                related AS (
+                    SELECT s.b AS id FROM similar s JOIN tagged ON s.a = tagged.id
+                    UNION ALL
+                    SELECT s.a AS id FROM similar s JOIN tagged ON s.b = tagged.id
+                )
+                SELECT MIN(b.id), b.content, COUNT(*) AS relevance
+                FROM related JOIN blocks b ON b.id = related.id
+                GROUP BY b.content
+                ORDER BY relevance DESC
+                LIMIT ?
+                """,
+                (tag, limit),
+            ).fetchall()
+            block_tags = self._tags_for([block_id for block_id, _, _ in rows])
+            return [
+                {"content": content, "related_tags": block_tags[block_id], "relevance": relevance}
+                for block_id, content, relevance in rows
+            ]
+
+    def explore(self, start_content: str, max_depth: int) -> list[dict[str, Any]]:
+        """Breadth-first walk over SIMILAR edges and shared tags (block -> tag -> block is two hops)."""
+        with self._lock:
+            rows = self._conn.execute("SELECT id FROM blocks WHERE content = ?", (start_content,))
+            starts = [("block", block_id) for (block_id,) in rows]
+            seen = set(starts)
+            queue = deque((start, []) for start in starts)
+            found: list[tuple[int, list[str]]] = []
+            while queue:
+                (kind, node_id), path = queue.popleft()
+                if len(path) >= max_depth:
+                    continue
+                for neighbour, edge in self._neighbours(kind, node_id):
+                    if neighbour in seen:
+                        continue
+                    seen.add(neighbour)
+                    next_path = [*path, edge]
+                    if neighbour[0] == "block":
+                        found.append((neighbour[1], next_path))
+                    queue.append((neighbour, next_path))
+
+            contents = self._contents_for([block_id for block_id, _ in found])
+            results: dict[str, dict[str, Any]] = {}
+            for block_id, path in found:
+                # Breadth-first, so the first path found to a text is a shortest one
+                content = contents[block_id]
+                if content != start_content and content not in results:
+                    results[content] = {"content": content, "connection_types": path, "distance": len(path)}
+            return list(results.values())
+
+    def _neighbours(self, kind: str, node_id: int) -> list[tuple[tuple[str, int], str]]:
+        if kind == "tag":
+            rows = self._conn.execute("SELECT block_id FROM block_tags WHERE tag_id = ?", (node_id,))
+            return [(("block", block_id), "TAGGED") for (block_id,) in rows]
+
+        similar = self._conn.execute(
+            "SELECT b FROM similar WHERE a = ? UNION SELECT a FROM similar WHERE b = ?", (node_id, node_id),
+        )
+        tags = self._conn.execute("SELECT tag_id FROM block_tags WHERE block_id = ?", (node_id,))
+        return [(("block", other), "SIMILAR") for (other,) in similar] + [
+            (("tag", tag_id), "TAGGED") for (tag_id,) in tags
+        ]
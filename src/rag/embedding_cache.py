@@ -0,0 +1,177 @@
+import hashlib
+import json
+import re
+from collections import OrderedDict
+from pathlib import Path
+
+import numpy as np
+
+from utils import get_logger
+
+
+logger = get_logger(__name__)
+
+INITIAL_ROWS = 1024
+
+
+def normalize_text(text: str) -> str:
+    """Collapse whitespace so cosmetic edits do not defeat the cache."""
+    return " ".join(text.split())
+
+
+def text_key(text: str) -> str:
+    return hashlib.blake2b(normalize_text(text).encode(), digest_size=16).hexdigest()
+
+
+class EmbeddingCache:
+    """Disk-backed LRU cache of embeddings keyed by (model, normalized text hash).
+
+    Vectors live in a memory-mapped matrix (``vectors.bin``) that grows by doubling up
+    to ``max_entries`` rows; ``index.json`` maps text keys to rows in LRU order. Each
+    model gets its own directory, so switching models never serves stale vectors.
+    """
+
+    def __init__(
+        self,
+        directory: Path,
+        model_name: str,
+        dimension: int,
+        max_entries: int,
+        dtype: str = "float16",
+    ) -> None:
+        slug = re.sub(r"[^A-Za-z0-9_.-]+", "_", model_name)
+        self.directory = directory / f"{slug}-{hashlib.blake2b(model_name.encode(), digest_size=4).hexdigest()}"
+        self.model_name = model_name
+        self.dimension = dimension
+        self.max_entries = max_entries
+        self.dtype = np.dtype(dtype)
+        self.hits = 0
+        self.misses = 0
+
+        self._index_path = self.directory / "index.json"
+        self._vectors_path = self.directory / "vectors.bin"
+        self._slots: OrderedDict[str, int] = OrderedDict()
+        self._free: list[int] = []
+        self._rows = 0
+        self._vectors: np.memmap | None = None
+        self._dirty = False
+        self._touched = False
+        self._load()
+
+    def _load(self) -> None:
+        try:
+            index = json.loads(self._index_path.read_text(encoding="utf-8"))
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError):
+            logger.exception("Could not read embedding cache index %s, starting empty", self._index_path)
+            return
+
+        expected = {"model": self.model_name, "dimension": self.dimension, "dtype": self.dtype.name}
+        if any(index.get(k) != v for k, v in expected.items()) or not index.get("complete"):
+            # Written by another configuration, or the last writer died before saving: rows can't be trusted
+            logger.warning("Discarding embedding cache at %s", self.directory)
+            return
+
+        self._rows = index["rows"]
+        self._slots = OrderedDict(index["slots"])
+        used = set(self._slots.values())
+        self._free = [row for row in range(self._rows) if row not in used]
+        if self._rows:
+            self._vectors = np.memmap(
+                self._vectors_path,
+                dtype=self.dtype,
+                mode="r+",
+                shape=(self._rows, self.dimension),
+            )
+
+    def __len__(self) -> int:
+        return len(self._slots)
+
+    def get_many(self, texts: list[str]) -> list[np.ndarray | None]:
+        """Return cached vectors (float32) for ``texts``, ``None`` for misses."""
+        results: list[np.ndarray | None] = []
+        for text in texts:
+            key = text_key(text)
+            row = self._slots.get(key)
+            if row is None or self._vectors is None:
+                self.misses += 1
+                results.append(None)
+                continue
+            self._slots.move_to_end(key)
+            self._touched = True
+            self.hits += 1
+            results.append(np.asarray(self._vectors[row], dtype=np.float32))
+        return results
+
+    def put_many(self, texts: list[str], vectors: list[np.ndarray]) -> None:
+        if not texts:
+            return
+        self._mark_dirty()
+        for text, vector in zip(texts, vectors, strict=True):
+            key = text_key(text)
+            row = self._slots.get(key)
+            if row is None:
+                row = self._allocate_row()
+            self._slots[key] = row
+            self._slots.move_to_end(key)
+            self._vectors[row] = vector  # type: ignore[index]
+
+    def _allocate_row(self) -> int:
+        if self._free:
+            return self._free.pop()
+        if self._rows < self.max_entries:
+            self._grow(min(max(self._rows * 2, INITIAL_ROWS), self.max_entries))
+            return self._free.pop()
+        # Full: evict the least recently used entry and reuse its row
+        _, row = self._slots.popitem(last=False)
+        return row
+
+    def _grow(self, rows: int) -> None:
+        if self._vectors is not None:
+            self._vectors.flush()
+            del self._vectors
+        self.directory.mkdir(parents=True, exist_ok=True)
+        with self._vectors_path.open("ab") as file:
+            file.truncate(rows * self.dimension * self.dtype.itemsize)
+        self._vectors = np.memmap(self._vectors_path, dtype=self.dtype, mode="r+", shape=(rows, self.dimension))
+        self._free.extend(range(rows - 1, self._rows - 1, -1))
+        self._rows = rows
+
+    def _mark_dirty(self) -> None:
+        if not self._dirty:
+            # Rows may be overwritten from here on: invalidate the on-disk index until save()
+            self._write_index(complete=False)
+            self._dirty = True
+
+    def _write_index(self, *, complete: bool) -> None:
+        self.directory.mkdir(parents=True, exist_ok=True)
+        payload = {
+            "model": self.model_name,
+            "dimension": self.dimension,
+            "dtype": self.dtype.name,
+            "rows": self._rows,
+            "complete": complete,
+            "slots": list(self._slots.items()) if complete else [],
+        }
+        tmp_path = self._index_path.with_suffix(".json.tmp")
+        tmp_path.write_text(json.dumps(payload, separators=(",", ":")), encoding="utf-8")
+        tmp_path.replace(self._index_path)
+
+    def save(self) -> None:
+        if not self._dirty and not self._touched:
+            return
+        if self._vectors is not None:
+            self._vectors.flush()
+        self._write_index(complete=True)
+        self._dirty = self._touched = False
+
+    def log_stats(self) -> None:
+        lookups = self.hits + self.misses
+        logger.info(
+            "Embedding cache: %d hits, %d misses (%.1f%% hit rate), %d entries",
+            self.hits,
+            self.misses,
+            100 * self.hits / lookups if lookups else 0.0,
+            len(self),
+        )
@@ -0,0 +1,205 @@
+import multiprocessing
+import os
+import queue
+import threading
+from dataclasses import dataclass
+from multiprocessing.queues import Queue
+from multiprocessing.shared_memory import SharedMemory
+from typing import TYPE_CHECKING
+
+import numpy as np
+from tqdm.auto import tqdm
+
+from utils import get_logger
+
+from .model_registry import get_model
+
+
+if TYPE_CHECKING:
+    from sentence_transformers import SentenceTransformer
+
+
+logger = get_logger(__name__)
+
+RESULT_POLL_SECONDS = 1.0
+
+
+@dataclass(frozen=True)
+class _WorkerSpec:
+    model_name: str
+    device: str
+    dimension: int
+    warmup: bool
+    torch_threads: int
+
+
+def _encode_batch(model: "SentenceTransformer", spec: _WorkerSpec, texts: list[str]) -> np.ndarray:
+    vectors = model.encode(texts, batch_size=len(texts), convert_to_numpy=True).astype(np.float32, copy=False)
+    if vectors.shape[1] != spec.dimension:
+        msg = f"{spec.model_name} produces {vectors.shape[1]}-d vectors, config says {spec.dimension}"
+        raise ValueError(msg)
+    return vectors
+
+
+def _worker_main(spec: _WorkerSpec, tasks: Queue, results: Queue) -> None:
+    """Embedding worker: load the model once, then encode batches into shared memory until told to stop."""
+    # Imported here so the parent process never pays for torch
+    import torch  # noqa: PLC0415
+
+    torch.set_num_threads(spec.torch_threads)
+    model = get_model(spec.model_name, spec.device, warmup=spec.warmup)
+    dimension = spec.dimension
+
+    while (task := tasks.get()) is not None:
+        job_id, shm_name, row_offset, texts = task
+        try:
+            vectors = _encode_batch(model, spec, texts)
+            # Spawned workers share the parent's resource tracker, so attaching here does not
+            # register a second owner; the parent unlinks the segment
+            shm = SharedMemory(name=shm_name)
+            try:
+                row_bytes = dimension * vectors.itemsize
+                out = np.ndarray(vectors.shape, dtype=np.float32, buffer=shm.buf, offset=row_offset * row_bytes)
+                out[:] = vectors
+                del out
+            finally:
+                shm.close()
+            results.put((job_id, None))
+        except Exception as e:  # noqa: BLE001
+            results.put((job_id, repr(e)))
+
+
+class EmbeddingService:
+    """Persistent pool of embedding workers that keep the model resident.
+
+    Workers are started once (on first use) and fed batches over a queue. Each
+    ``encode`` call allocates one shared-memory matrix that workers write their rows
+    into directly, so vectors never travel back as pickled lists. With ``workers=0``
+    the calling process's shared model from ``get_model`` is used instead.
+    """
+
+    def __init__(  # noqa: PLR0913
+        self,
+        model_name: str,
+        device: str,
+        dimension: int,
+        *,
+        workers: int,
+        batch_size: int,
+        chunk_size: int,
+        warmup: bool = True,
+    ) -> None:
+        self.model_name = model_name
+        self.device = device
+        self.dimension = dimension
+        self.warmup = warmup
+        self.workers = workers
+        self.batch_size = batch_size
+        self.chunk_size = chunk_size
+
+        self._lock = threading.Lock()
+        self._processes: list[multiprocessing.process.BaseProcess] = []
+        self._tasks: Queue | None = None
+        self._results: Queue | None = None
+        self._next_job = 0
+
+    def start(self) -> None:
+        if self.workers <= 0 or self._processes:
+            return
+
+        # Always spawn: a fork taken while the parser, writer or progress threads hold a lock
+        # can deadlock the child, and CUDA cannot be re-initialised in a forked child anyway
+        ctx = multiprocessing.get_context("spawn")
+        self._tasks = ctx.Queue()
+        self._results = ctx.Queue()
+        spec = _WorkerSpec(
+            self.model_name,
+            self.device,
+            self.dimension,
+            self.warmup,
+            torch_threads=max(1, (os.cpu_count() or 1) // self.workers),
+        )
+        for _ in range(self.workers):
+            process = ctx.Process(target=_worker_main, args=(spec, self._tasks, self._results), daemon=True)
+            process.start()
+            self._processes.append(process)
+        logger.info("Started %d embedding workers for %s", self.workers, self.model_name)
+
+    def close(self) -> None:
+        if not self._processes:
+            return
+        for _ in self._processes:
+            self._tasks.put(None)
+        for process in self._processes:
+            process.join(timeout=10)
+            if process.is_alive():
+                process.terminate()
+        self._processes = []
+        logger.info("Embedding workers stopped")
+
+    def encode(self, texts: list[str], pbar: tqdm | None = None) -> np.ndarray:
+        """Embed ``texts`` and return a float32 matrix with one row per text, in input order.
+
+        Texts are encoded in order of length so each batch holds similarly sized inputs and
+        wastes little work on padding; rows are scattered back to the caller's order.
+        """
+        with self._lock:
+            if pbar is not None:
+                pbar.total = -(-len(texts) // self.batch_size)
+                pbar.reset()
+
+            # Character length is a cheap, monotonic stand-in for token length
+            order = sorted(range(len(texts)), key=lambda i: len(texts[i]))
+            sorted_texts = [texts[i] for i in order]
+
+            parts = [np.empty((0, self.dimension), dtype=np.float32)]
+            for i in range(0, len(sorted_texts), self.chunk_size):
+                chunk = sorted_texts[i : i + self.chunk_size]
+                parts.append(self._encode_chunk(chunk, pbar) if self.workers > 0 else self._encode_local(chunk, pbar))
+
+            vectors = np.empty((len(texts), self.dimension), dtype=np.float32)
+            vectors[order] = np.concatenate(parts)
+            return vectors
+
+    def _encode_local(self, texts: list[str], pbar: tqdm | None) -> np.ndarray:
+        model = get_model(self.model_name, self.device, warmup=self.warmup)
+        vectors = []
+        for j in range(0, len(texts), self.batch_size):
+            vectors.append(model.encode(texts[j : j + self.batch_size], convert_to_numpy=True))
+            if pbar is not None:
+                pbar.update(1)
+        return np.concatenate(vectors).astype(np.float32, copy=False)
+
+    def _encode_chunk(self, texts: list[str], pbar: tqdm | None) -> np.ndarray:
+        self.start()
+        shm = SharedMemory(create=True, size=len(texts) * self.dimension * np.dtype(np.float32).itemsize)
+        try:
+            pending = set()
+            for j in range(0, len(texts), self.batch_size):
+                job_id = self._next_job
+                self._next_job += 1
+                pending.add(job_id)
+                self._tasks.put((job_id, shm.name, j, texts[j : j + self.batch_size]))
+
+            while pending:
+                try:
+                    job_id, error = self._results.get(timeout=RESULT_POLL_SECONDS)
+                except queue.Empty:
+                    if not all(process.is_alive() for process in self._processes):
+                        msg = "An embedding worker exited unexpectedly"
+                        raise RuntimeError(msg) from None
+                    continue
+                if job_id not in pending:
+                    # Leftover from an earlier call that was aborted
+                    continue
+                if error is not None:
+                    msg = f"Embedding worker failed: {error}"
+                    raise RuntimeError(msg)
+                pending.discard(job_id)
+                if pbar is not None:
+                    pbar.update(1)
+
+            return np.ndarray((len(texts), self.dimension), dtype=np.float32, buffer=shm.buf).copy()
+        finally:
+            shm.close()
+            shm.unlink()
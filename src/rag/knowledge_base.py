@@ -1,22 +1,22 @@
-import gc
-import multiprocessing
 import re
 import time
-from concurrent.futures import ThreadPoolExecutor
+from collections.abc import Iterable
 from dataclasses import dataclass
+from functools import cached_property, partial
 from pathlib import Path
 
-from neo4j import Driver, GraphDatabase, Session
-from sentence_transformers import SentenceTransformer
+import numpy as np
 from tqdm.auto import tqdm
 
-from config import load_config
+from config import get_config
 from utils import get_logger
 
-
-# Set start method to 'spawn' for CUDA support
-if load_config()["knowledge_base"]["embedding"]["device"] == "cuda":
-    multiprocessing.set_start_method("spawn", force=True)
+from .backends import StorageBackend, create_backend
+from .embedding_cache import EmbeddingCache
+from .embedding_service import EmbeddingService
+from .manifest import FileEntry, SyncManifest, content_digest
+from .pipeline import SyncPipeline
+from .writer import BulkWriter
 
 
 @dataclass
@@ -26,113 +26,188 @@ class Block:
     tags: list[str]
     embedding: list[float] | None = None
 
+    @property
+    def digest(self) -> str:
+        return content_digest(f"{self.level}:{self.content}".encode())
+
+
+@dataclass
+class FileChanges:
+    path: Path
+    entry: FileEntry
+    added_blocks: list[Block]
+    removed_hashes: list[str]
+    replace: bool = False
+
 
 class KnowledgeBaseProcessor:
     def __init__(self) -> None:
-        self.config = load_config()
+        self.config = get_config()
+        self.kb_config = self.config.knowledge_base
         self.logger = get_logger(__name__)
 
-        # Initialize embedding model with config
-        embedding_config = self.config["knowledge_base"]["embedding"]
-        self.model = SentenceTransformer(embedding_config["model"], device=embedding_config["device"])
-        self.similarity_threshold = embedding_config["similarity_threshold"]
+        self.model_name = self.kb_config.embedding.model
+        self.similarity_threshold = self.kb_config.embedding.similarity_threshold
+        # One manifest per backend, so switching backends re-syncs into the new store
+        self.manifest_path = self.config.data_dir / f"kb_manifest.{self.kb_config.database.type}.json"
+
+        self.backend: StorageBackend = create_backend(self.config)
+        self._database_ready = False
+
+    @cached_property
+    def embedding_service(self) -> EmbeddingService:
+        """Embedding workers, started on first use so no-change syncs never load the model."""
+        embedding_config = self.kb_config.embedding
+        return EmbeddingService(
+            self.model_name,
+            embedding_config.device,
+            embedding_config.dimension,
+            workers=embedding_config.workers,
+            batch_size=self.kb_config.processing.embedding_batch_size,
+            chunk_size=embedding_config.chunk_size,
+            warmup=embedding_config.warmup,
+        )
 
-        # Initialize Neo4j connection
-        db_config = self.config["knowledge_base"]["database"]
-        self.driver: Driver = GraphDatabase.driver(
-            db_config["uri"],
-            auth=(db_config["user"], db_config["password"]),
+    @cached_property
+    def manifest(self) -> SyncManifest:
+        """Sync manifest, read once and kept in memory for the processor's lifetime."""
+        return SyncManifest.load(self.manifest_path)
+
+    @cached_property
+    def embedding_cache(self) -> EmbeddingCache | None:
+        cache_config = self.kb_config.embedding.cache
+        if not cache_config.enabled:
+            return None
+        return EmbeddingCache(
+            self.config.data_dir / "embedding_cache",
+            self.model_name,
+            self.kb_config.embedding.dimension,
+            max_entries=cache_config.max_entries,
+            dtype=cache_config.dtype,
         )
 
-    def __del__(self) -> None:
-        """Cleanup Neo4j connection."""
-        if hasattr(self, "driver"):
-            self.driver.close()
-
-    def _setup_database(self) -> None:
-        db_config = self.config["knowledge_base"]["database"]
-
-        with self.driver.session() as session:
-            # Create configurable constraints
-            for constraint in db_config["constraints"]:
-                session.run(f"""
-                    CREATE CONSTRAINT {constraint['name']} IF NOT EXISTS
-                    FOR (b:{constraint['node']}) REQUIRE b.{constraint['property']} IS UNIQUE
-                """)
-
-            # Create vector index from config
-            vector_idx = db_config["vector_index"]
-            session.run(f"""
-                CALL db.index.vector.createNodeIndex(
-                    '{vector_idx['name']}',
-                    '{vector_idx['node']}',
-                    '{vector_idx['property']}',
-                    {self.config['knowledge_base']['embedding']['dimension']},
-                    '{vector_idx['algorithm']}'
-                )
-            """)
-
-    def _get_file_signature(self, file_path: Path) -> tuple[float, int]:
-        """Get file modification time and size."""
-        stat = file_path.stat()
-        return (stat.st_mtime, stat.st_size)
-
-    def _get_processed_files(self, session: Session) -> dict[str, tuple[float, int]]:
-        """Get all previously processed files and their signatures from DB."""
-        result = session.run("""
-            MATCH (b:Block)
-            WITH b.source_file as file, max(b.last_modified) as mtime, count(*) as size
-            RETURN file, mtime, size
-        """)
-        return {r["file"]: (r["mtime"], r["size"]) for r in result if r["file"]}
+    def close(self) -> None:
+        """Stop the embedding workers and close the storage backend."""
+        if "embedding_service" in self.__dict__:
+            self.embedding_service.close()
+        if hasattr(self, "backend"):
+            self.backend.close()
+            del self.backend
 
-    def sync_knowledge_base(self) -> None:
-        self.logger.info("Starting knowledge base synchronization...")
+    def __del__(self) -> None:
+        """Cleanup storage backend."""
+        self.close()
 
-        # Collect all files
+    def _collect_files(self) -> list[Path]:
         all_files = []
-        for source_type, source_info in self.config["sources"].items():
-            source_path = Path(source_info["path"])
-            files = list(source_path.glob(source_info["pattern"]))
-            all_files.extend(files)
-
-        with self.driver.session() as session:
-            # Get previously processed files
-            processed_files = self._get_processed_files(session)
-
-            # Determine which files need processing
-            files_to_process = []
-            for file_path in all_files:
-                file_str = str(file_path)
-                current_signature = self._get_file_signature(file_path)
+        for source in self.config.sources.values():
+            all_files.extend(source.path.glob(source.pattern))
+        return all_files
+
+    def _find_changed_files(self, manifest: SyncManifest, all_files: list[Path]) -> list[Path]:
+        """Compare files against the manifest, reading only those whose stat signature moved."""
+        changed = []
+        for file_path in all_files:
+            file_str = str(file_path)
+            entry = manifest.get(file_str)
+            stat = file_path.stat()
+
+            if entry is None or entry.model != self.model_name:
+                changed.append(file_path)
+                continue
+            if entry.mtime == stat.st_mtime and entry.size == stat.st_size:
+                continue
+
+            # Touched but possibly identical (e.g. Logseq re-saving a page): compare content hashes
+            if content_digest(file_path.read_bytes()) == entry.content_hash:
+                entry.mtime, entry.size = stat.st_mtime, stat.st_size
+                manifest.record(file_str, entry)
+            else:
+                changed.append(file_path)
+        return changed
 
-                if file_str not in processed_files or processed_files[file_str] != current_signature:
-                    files_to_process.append(file_path)
+    def sync_knowledge_base(self) -> None:
+        self.logger.info("Starting knowledge base synchronization...")
+        start = time.perf_counter()
 
-            if not files_to_process:
-                self.logger.info("No files have changed since last sync. Nothing to do.")
-                return
+        manifest = self.manifest
+        all_files = self._collect_files()
+        files_to_process = self._find_changed_files(manifest, all_files)
+        removed_files = manifest.paths() - {str(file_path) for file_path in all_files}
 
+        if not files_to_process and not removed_files:
+            manifest.save()
             self.logger.info(
-                f"Found {len(files_to_process)} files that need processing " f"out of {len(all_files)} total files"
+                "No files have changed since last sync. Nothing to do (%.3fs).", time.perf_counter() - start,
             )
+            return
+
+        self.logger.info(
+            "Found %d files that need processing and %d removed files out of %d total files",
+            len(files_to_process),
+            len(removed_files),
+            len(all_files),
+        )
+        self._apply_changes(manifest, files_to_process, removed_files)
+        self.logger.info("Knowledge base synchronized in %.2fs", time.perf_counter() - start)
+
+    def sync_files(self, paths: Iterable[Path]) -> None:
+        """Sync only ``paths``, which may have been created, modified or deleted."""
+        start = time.perf_counter()
+        manifest = self.manifest
+        paths = set(paths)
+        existing = [path for path in paths if path.is_file()]
+        removed_files = {str(path) for path in paths if not path.is_file()} & manifest.paths()
+        files_to_process = self._find_changed_files(manifest, existing)
+
+        if not files_to_process and not removed_files:
+            manifest.save()
+            return
+
+        self._apply_changes(manifest, files_to_process, removed_files)
+        self.logger.info(
+            "Synced %d changed and %d removed files in %.2fs",
+            len(files_to_process),
+            len(removed_files),
+            time.perf_counter() - start,
+        )
+
+    def _apply_changes(self, manifest: SyncManifest, files_to_process: list[Path], removed_files: set[str]) -> None:
+        self._ensure_database()
+        processing = self.kb_config.processing
+        writer = self._make_writer()
+        pipeline = SyncPipeline(
+            self,
+            manifest,
+            writer,
+            parallel_files=processing.parallel_files,
+            batch_size=processing.batch_size,
+            skip_errors=processing.skip_errors,
+        )
+        files = []
+        for file_path in files_to_process:
+            previous = manifest.get(str(file_path))
+            # Without usable block hashes to diff against, the file's blocks are replaced wholesale
+            files.append((file_path, previous if previous and previous.model == self.model_name else None))
 
-            # Process only changed files
-            with tqdm(total=len(files_to_process), desc="Processing Files") as pbar:
-                for file_path in files_to_process:
-                    # Before processing new version, delete old blocks
-                    session.run(
-                        """
-                        MATCH (b:Block)
-                        WHERE b.source_file = $file
-                        DETACH DELETE b
-                    """,
-                        {"file": str(file_path)},
-                    )
-
-                    # Process the file
-                    self.process_file(file_path)
-                    pbar.update(1)
+        try:
+            for file_str in removed_files:
+                writer.delete_file(file_str, on_commit=partial(manifest.remove, file_str))
+            pipeline.run(files)
+        finally:
+            manifest.save()
+            writer.log_stats()
+            if self.embedding_cache is not None:
+                self.embedding_cache.save()
+                self.embedding_cache.log_stats()
+
+    def _make_writer(self) -> BulkWriter:
+        return BulkWriter(self.backend, self.kb_config.processing.batch_size)
+
+    def _ensure_database(self) -> None:
+        if not self._database_ready:
+            self.backend.setup()
+            self._database_ready = True
 
     def extract_metadata(self, content: str) -> list[str]:
         """Extract hashtags and wiki-links from content."""
@@ -140,115 +215,80 @@ class KnowledgeBaseProcessor:
         wikilinks = re.findall(r"\[\[(.*?)\]\]", content)
         return list(set(hashtags + wikilinks))  # Remove duplicates
 
-    def parse_blocks(self, content: str, embedding_pbar: tqdm | None = None) -> list[Block]:
+    def parse_blocks(self, content: str) -> list[Block]:
         blocks = []
-        texts_to_embed = []
-
-        # First pass: create blocks without embeddings
         for line in content.splitlines():
             if line.strip().startswith("- "):
                 level = (len(line) - len(line.lstrip())) // 4
-                content = line.strip("- ").strip()
-                tags = self.extract_metadata(content)
-                blocks.append(Block(content=content, level=level, tags=tags, embedding=None))
-                texts_to_embed.append(content)
-
-        # Get chunk and batch sizes from config
-        chunk_size = self.config["knowledge_base"]["embedding"]["chunk_size"]
-        batch_size = self.config["knowledge_base"]["processing"]["embedding_batch_size"]
-
-        embeddings_list = []
-        for i in range(0, len(texts_to_embed), chunk_size):
-            chunk = texts_to_embed[i : i + chunk_size]
-            batches = [chunk[j : j + batch_size] for j in range(0, len(chunk), batch_size)]
-
-            if embedding_pbar is not None:
-                embedding_pbar.total = len(batches)
-                embedding_pbar.reset()
-
-            with multiprocessing.Pool(processes=self.config["system"]["cpu_threads"]) as pool:
-                for result in pool.imap(self.model.encode, batches):
-                    embeddings_list.extend(result)
-                    if embedding_pbar is not None:
-                        embedding_pbar.update(1)
-                gc.collect()
-                pool.close()
-                pool.join()
-
-        for block, embedding in zip(blocks, embeddings_list, strict=False):
-            block.embedding = embedding.tolist()
-
+                text = line.strip("- ").strip()
+                blocks.append(Block(content=text, level=level, tags=self.extract_metadata(text)))
         return blocks
 
-    def create_block_node(self, session: Session, block: Block, file_path: str) -> None:
-        """Create a node for a block with its embedding."""
-        query = """
-        MERGE (b:Block {content: $content})
-        SET b.embedding = $embedding,
-            b.level = $level,
-            b.source_file = $source_file,
-            b.last_modified = $last_modified
-        """
-        session.run(
-            query,
-            {
-                "content": block.content,
-                "embedding": block.embedding,
-                "level": block.level,
-                "source_file": file_path,
-                "last_modified": Path(file_path).stat().st_mtime,
-            },
+    def embed_blocks(self, blocks: list[Block], embedding_pbar: tqdm | None = None) -> None:
+        """Fill in embeddings for the given blocks in place, consulting the embedding cache first."""
+        texts = [block.content for block in blocks]
+        cache = self.embedding_cache
+        vectors = cache.get_many(texts) if cache is not None else [None] * len(texts)
+
+        # Identical blocks (templates, TODOs, recurring headers) are only encoded once
+        missing = list(dict.fromkeys(text for text, vector in zip(texts, vectors, strict=True) if vector is None))
+        encoded = dict(zip(missing, self._encode(missing, embedding_pbar), strict=True))
+        if cache is not None:
+            cache.put_many(missing, [encoded[text] for text in missing])
+
+        for block, vector in zip(blocks, vectors, strict=True):
+            block.embedding = (vector if vector is not None else encoded[block.content]).tolist()
+
+    def _encode(self, texts_to_embed: list[str], embedding_pbar: tqdm | None = None) -> list[np.ndarray]:
+        if not texts_to_embed:
+            return []
+        return list(self.embedding_service.encode(texts_to_embed, embedding_pbar))
+
+    def _diff_file(self, file_path: Path, previous: FileEntry | None) -> FileChanges | None:
+        """Parse a file and work out which of its blocks differ from ``previous``."""
+        try:
+            # Stat before reading so a concurrent edit shows up as a change on the next sync
+            stat = file_path.stat()
+            data = file_path.read_bytes()
+            blocks = self.parse_blocks(data.decode("utf-8"))
+        except Exception:
+            self.logger.exception("Error reading %s", file_path)
+            return None
+
+        old_hashes = set(previous.block_hashes) if previous else set()
+        new_hashes = {block.digest for block in blocks}
+        return FileChanges(
+            path=file_path,
+            entry=FileEntry(
+                mtime=stat.st_mtime,
+                size=stat.st_size,
+                content_hash=content_digest(data),
+                model=self.model_name,
+                block_hashes=[b.digest for b in blocks],
+            ),
+            added_blocks=list({b.digest: b for b in blocks if b.digest not in old_hashes}.values()),
+            removed_hashes=list(old_hashes - new_hashes),
+            replace=previous is None,
         )
 
-    def create_tag_relationship(self, session: Session, content: str, tag: str) -> None:
-        """Create tag node and relationship."""
-        query = """
-        MERGE (t:Tag {name: $tag})
-        WITH t
-        MATCH (b:Block {content: $content})
-        MERGE (b)-[:TAGGED]->(t)
-        """
-        session.run(query, {"tag": tag, "content": content})
-
-    def create_semantic_relationships(self, session: Session) -> None:
-        """Create SIMILAR relationships between semantically similar blocks."""
-        query = """
-        MATCH (b1:Block)
-        MATCH (b2:Block)
-        WHERE elementId(b1) < elementId(b2)  // Using elementId() instead of id()
-        WITH b1, b2, gds.similarity.cosine(b1.embedding, b2.embedding) as similarity
-        WHERE similarity > $threshold
-        MERGE (b1)-[:SIMILAR {score: similarity}]->(b2)
+    def process_file(self, file_path: Path, previous: FileEntry | None = None) -> FileEntry | None:
+        """Apply the blocks of a file that differ from ``previous`` and return its new manifest entry.
+
+        Only added or changed blocks are embedded and upserted, blocks that disappeared are
+        deleted in one statement, and unchanged blocks (with their edges) are left untouched.
         """
-        session.run(query, {"threshold": self.similarity_threshold})
+        changes = self._diff_file(file_path, previous)
+        if changes is None:
+            return None
 
-    def process_file(self, file_path: Path) -> None:
         try:
-            content = file_path.read_text(encoding="utf-8")
-            blocks = self.parse_blocks(content)
-
-            # Get file signature
-            file_signature = self._get_file_signature(file_path)
-
-            with self.driver.session() as session:
-                # Store blocks with file metadata
-                session.run(
-                    """
-                    UNWIND $blocks as block
-                    MERGE (b:Block {content: block.content})
-                    SET b.embedding = block.embedding,
-                        b.level = block.level,
-                        b.source_file = $source_file,
-                        b.last_modified = $last_modified,
-                        b.file_size = $file_size
-                """,
-                    {
-                        "blocks": [{"content": b.content, "embedding": b.embedding, "level": b.level} for b in blocks],
-                        "source_file": str(file_path),
-                        "last_modified": file_signature[0],  # mtime
-                        "file_size": file_signature[1],  # size
-                    },
-                )
-
-        except Exception as e:
-            self.logger.exception(f"Error processing {file_path}: {e}")
+            self._ensure_database()
+            self.embed_blocks(changes.added_blocks)
+            writer = self._make_writer()
+            writer.add(changes)
+            writer.flush()
+        except Exception:
+            self.logger.exception("Error processing %s", file_path)
+            return None
+
+        return changes.entry
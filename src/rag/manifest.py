@@ -0,0 +1,86 @@
+import hashlib
+import json
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+
+from utils import get_logger
+
+
+logger = get_logger(__name__)
+
+# Version 2: blocks are stored per (source_file, hash), so stores synced under version 1 are rebuilt
+MANIFEST_VERSION = 2
+
+
+def content_digest(data: bytes) -> str:
+    """Return a short, stable digest for a blob of content."""
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+
+@dataclass
+class FileEntry:
+    mtime: float
+    size: int
+    content_hash: str
+    model: str
+    block_hashes: list[str] = field(default_factory=list)
+
+
+class SyncManifest:
+    """On-disk record of what has been synced into the knowledge base.
+
+    The manifest maps each source file to the signature it had when it was last
+    synced, so an unchanged vault can be detected with a single ``stat`` per file
+    and without touching the database.
+    """
+
+    def __init__(self, path: Path, entries: dict[str, FileEntry] | None = None) -> None:
+        self.path = path
+        self.entries: dict[str, FileEntry] = entries or {}
+        self._dirty = False
+
+    @classmethod
+    def load(cls, path: Path) -> "SyncManifest":
+        """Load the manifest, starting empty if it is missing or unreadable."""
+        try:
+            raw = json.loads(path.read_text(encoding="utf-8"))
+        except FileNotFoundError:
+            return cls(path)
+        except (OSError, ValueError):
+            logger.exception("Could not read sync manifest %s, starting from scratch", path)
+            return cls(path)
+
+        if raw.get("version") != MANIFEST_VERSION:
+            logger.warning("Sync manifest %s has an unknown version, starting from scratch", path)
+            return cls(path)
+
+        return cls(path, {file: FileEntry(**entry) for file, entry in raw["files"].items()})
+
+    def get(self, file: str) -> FileEntry | None:
+        return self.entries.get(file)
+
+    def record(self, file: str, entry: FileEntry) -> None:
+        self.entries[file] = entry
+        self._dirty = True
+
+    def remove(self, file: str) -> None:
+        if self.entries.pop(file, None) is not None:
+            self._dirty = True
+
+    def paths(self) -> set[str]:
+        return set(self.entries)
+
+    def save(self) -> None:
+        """Atomically write the manifest back to disk if anything changed."""
+        if not self._dirty:
+            return
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_suffix(self.path.suffix + ".tmp")
+        payload = {
+            "version": MANIFEST_VERSION,
+            "files": {file: asdict(entry) for file, entry in self.entries.items()},
+        }
+        tmp_path.write_text(json.dumps(payload, separators=(",", ":")), encoding="utf-8")
+        tmp_path.replace(self.path)
+        self._dirty = False
@@ -0,0 +1,64 @@
+import threading
+import time
+from typing import TYPE_CHECKING
+
+from utils import get_logger
+
+
+if TYPE_CHECKING:
+    from sentence_transformers import SentenceTransformer
+
+
+logger = get_logger(__name__)
+
+WARMUP_TEXTS = ["warm-up"] * 8
+
+_models: dict[tuple[str, str], "SentenceTransformer"] = {}
+_lock = threading.Lock()
+
+
+def get_model(model_name: str, device: str = "cpu", *, warmup: bool = True) -> "SentenceTransformer":
+    """Return the process-wide SentenceTransformer for ``model_name`` on ``device``, loading it on first use.
+
+    Every caller in the process (sync, retriever, generation-time lookups) gets the same
+    instance, so the model is read from disk and moved to the device only once.
+
+    Parameters
+    ----------
+    model_name : str
+        Name or path of the embedding model.
+    device : str, optional
+        Device to load the model on, by default "cpu".
+    warmup : bool, optional
+        Encode a small dummy batch right after loading so the first real request does
+        not pay for lazy initialisation (kernel selection, tokenizer caches), by default True.
+
+    Returns
+    -------
+    SentenceTransformer
+        The shared, loaded model.
+    """
+    key = (model_name, device)
+    model = _models.get(key)
+    if model is not None:
+        return model
+
+    with _lock:
+        model = _models.get(key)
+        if model is None:
+            from sentence_transformers import SentenceTransformer  # noqa: PLC0415
+
+            start = time.perf_counter()
+            model = SentenceTransformer(model_name, device=device)
+            loaded = time.perf_counter()
+            if warmup:
+                model.encode(WARMUP_TEXTS, batch_size=len(WARMUP_TEXTS))
+            logger.info(
+                "Loaded embedding model %s on %s in %.2fs (warm-up %.2fs)",
+                model_name,
+                device,
+                loaded - start,
+                time.perf_counter() - loaded,
+            )
+            _models[key] = model
+    return model
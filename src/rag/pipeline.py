@@ -0,0 +1,219 @@
+import contextlib
+import queue
+import threading
+import time
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from functools import partial
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, TypeVar
+
+from tqdm.auto import tqdm
+
+from utils import get_logger
+
+from .manifest import FileEntry, SyncManifest
+from .writer import BulkWriter
+
+
+if TYPE_CHECKING:
+    from .knowledge_base import FileChanges, KnowledgeBaseProcessor
+
+
+logger = get_logger(__name__)
+
+QUEUE_POLL_SECONDS = 0.5
+_DONE = object()
+
+_T = TypeVar("_T")
+
+
+class PipelineAbortedError(RuntimeError):
+    """Raised inside a stage when another stage has failed."""
+
+
+@dataclass
+class StageStats:
+    name: str
+    files: int = 0
+    blocks: int = 0
+    busy_seconds: float = 0.0
+    blocked_seconds: float = 0.0
+
+    def log(self) -> None:
+        logger.info(
+            "%s stage: %d files, %d blocks, %.2fs busy (%.0f blocks/sec), %.2fs blocked on downstream",
+            self.name,
+            self.files,
+            self.blocks,
+            self.busy_seconds,
+            self.blocks / self.busy_seconds if self.busy_seconds else 0.0,
+            self.blocked_seconds,
+        )
+
+
+class SyncPipeline:
+    """Read/parse, embed and write stages connected by bounded queues.
+
+    Parsing runs on ``parallel_files`` threads, embedding on one thread that gathers
+    parsed files into windows of about ``batch_size`` new blocks (so encode batches stay
+    full and length-sorted), and writing on one thread that feeds a ``BulkWriter``.
+    A full queue blocks the stage feeding it, which bounds memory on large syncs.
+    """
+
+    def __init__(  # noqa: PLR0913
+        self,
+        processor: "KnowledgeBaseProcessor",
+        manifest: SyncManifest,
+        writer: BulkWriter,
+        *,
+        parallel_files: int,
+        batch_size: int,
+        skip_errors: bool,
+    ) -> None:
+        self.processor = processor
+        self.manifest = manifest
+        self.writer = writer
+        self.skip_errors = skip_errors
+        self.parallel_files = max(1, parallel_files)
+        self.batch_size = max(1, batch_size)
+
+        self.stats = {name: StageStats(name) for name in ("parse", "embed", "write")}
+        self._abort = threading.Event()
+        self._parse_lock = threading.Lock()
+        self._errors: list[BaseException] = []
+        self._paths: queue.Queue[Any] = queue.Queue()
+        self._parsed: queue.Queue[Any] = queue.Queue(maxsize=self.parallel_files * 4)
+        self._embedded: queue.Queue[Any] = queue.Queue(maxsize=self.parallel_files * 4)
+
+    def run(self, files: list[tuple[Path, FileEntry | None]]) -> None:
+        for item in files:
+            self._paths.put(item)
+
+        with tqdm(total=len(files), desc="Syncing Files") as pbar:
+            embedder = threading.Thread(target=self._guard, args=(self._embed_stage,), name="kb-embed")
+            writer = threading.Thread(target=self._guard, args=(self._write_stage, pbar), name="kb-write")
+            embedder.start()
+            writer.start()
+            with ThreadPoolExecutor(max_workers=self.parallel_files, thread_name_prefix="kb-parse") as parsers:
+                for _ in range(self.parallel_files):
+                    parsers.submit(self._guard, self._parse_stage)
+            embedder.join()
+            writer.join()
+
+        for stage in self.stats.values():
+            stage.log()
+        if self._errors:
+            raise self._errors[0]
+
+    def _guard(self, stage: Callable[..., None], *args: object) -> None:
+        try:
+            stage(*args)
+        except PipelineAbortedError:
+            pass
+        except BaseException as e:
+            logger.exception("Knowledge base sync stage failed")
+            self._errors.append(e)
+            self._abort.set()
+
+    def _put(self, target: queue.Queue[_T], item: _T, stats: StageStats) -> None:
+        start = time.perf_counter()
+        while True:
+            if self._abort.is_set():
+                raise PipelineAbortedError
+            try:
+                target.put(item, timeout=QUEUE_POLL_SECONDS)
+                break
+            except queue.Full:
+                continue
+        stats.blocked_seconds += time.perf_counter() - start
+
+    def _get(self, source: queue.Queue[_T]) -> _T:
+        while True:
+            if self._abort.is_set():
+                raise PipelineAbortedError
+            try:
+                return source.get(timeout=QUEUE_POLL_SECONDS)
+            except queue.Empty:
+                continue
+
+    def _parse_stage(self) -> None:
+        stats = self.stats["parse"]
+        try:
+            while True:
+                try:
+                    file_path, previous = self._paths.get_nowait()
+                except queue.Empty:
+                    break
+                start = time.perf_counter()
+                changes = self.processor._diff_file(file_path, previous)  # noqa: SLF001
+                with self._parse_lock:
+                    stats.busy_seconds += time.perf_counter() - start
+                    if changes is not None:
+                        stats.files += 1
+                        stats.blocks += len(changes.added_blocks)
+                if changes is not None:
+                    self._put(self._parsed, changes, stats)
+        finally:
+            self._put_done(self._parsed)
+
+    def _embed_stage(self) -> None:
+        stats = self.stats["embed"]
+        window: list[FileChanges] = []
+        window_blocks = 0
+        parsers_left = self.parallel_files
+
+        while parsers_left:
+            item = self._get(self._parsed)
+            if item is _DONE:
+                parsers_left -= 1
+                continue
+            window.append(item)
+            window_blocks += len(item.added_blocks)
+            if window_blocks >= self.batch_size:
+                self._flush_window(window, stats)
+                window, window_blocks = [], 0
+
+        self._flush_window(window, stats)
+        self._put(self._embedded, _DONE, stats)
+
+    def _flush_window(self, window: list["FileChanges"], stats: StageStats) -> None:
+        if not window:
+            return
+        blocks = [block for changes in window for block in changes.added_blocks]
+        start = time.perf_counter()
+        self.processor.embed_blocks(blocks)
+        stats.busy_seconds += time.perf_counter() - start
+        stats.files += len(window)
+        stats.blocks += len(blocks)
+        for changes in window:
+            self._put(self._embedded, changes, stats)
+
+    def _write_stage(self, pbar: tqdm) -> None:
+        stats = self.stats["write"]
+        while (changes := self._get(self._embedded)) is not _DONE:
+            self._write(partial(self.writer.add, changes, on_commit=partial(self._committed, changes)), stats)
+            pbar.update(1)
+        self._write(self.writer.flush, stats)
+
+    def _write(self, action: Callable[[], None], stats: StageStats) -> None:
+        start = time.perf_counter()
+        try:
+            action()
+        except Exception:
+            if not self.skip_errors:
+                raise
+            # Files in the failed batch stay out of the manifest and are retried on the next sync
+            logger.exception("Error writing a batch of blocks to the knowledge base")
+        finally:
+            stats.busy_seconds += time.perf_counter() - start
+
+    def _committed(self, changes: "FileChanges") -> None:
+        self.manifest.record(str(changes.path), changes.entry)
+        self.stats["write"].files += 1
+        self.stats["write"].blocks += len(changes.added_blocks)
+
+    def _put_done(self, target: queue.Queue[Any]) -> None:
+        with contextlib.suppress(PipelineAbortedError):
+            self._put(target, _DONE, self.stats["parse"])
@@ -0,0 +1,102 @@
+import threading
+import time
+from fnmatch import fnmatch
+from pathlib import Path
+
+from watchdog.events import FileSystemEvent, FileSystemEventHandler, FileSystemMovedEvent
+from watchdog.observers import Observer
+
+from utils import get_logger
+
+from .knowledge_base import KnowledgeBaseProcessor
+
+
+logger = get_logger(__name__)
+
+
+class _DebouncedHandler(FileSystemEventHandler):
+    """Collect paths of matching files touched by filesystem events."""
+
+    def __init__(self, sources: list[tuple[Path, str]]) -> None:
+        self.sources = sources
+        self.pending: set[Path] = set()
+        self.last_event = 0.0
+        self.condition = threading.Condition()
+
+    def _matches(self, path: Path) -> bool:
+        return any(path.parent == directory and fnmatch(path.name, pattern) for directory, pattern in self.sources)
+
+    def on_any_event(self, event: FileSystemEvent) -> None:
+        if event.is_directory or event.event_type not in {"created", "modified", "deleted", "moved"}:
+            return
+
+        paths = [Path(event.src_path)]
+        if isinstance(event, FileSystemMovedEvent):
+            paths.append(Path(event.dest_path))
+
+        matching = [path for path in paths if self._matches(path)]
+        if not matching:
+            return
+        with self.condition:
+            self.pending.update(matching)
+            self.last_event = time.monotonic()
+            self.condition.notify()
+
+
+class KnowledgeBaseWatcher:
+    """Keep the knowledge base in sync with the note sources as files change.
+
+    The processor (embedding workers and storage backend) stays warm for the lifetime of
+    the watcher. Bursts of events are debounced: a batch is synced once no matching
+    file has changed for ``debounce_seconds``.
+    """
+
+    def __init__(self, processor: KnowledgeBaseProcessor, debounce_seconds: float) -> None:
+        self.processor = processor
+        self.debounce_seconds = debounce_seconds
+        self.sources = [(source.path, source.pattern) for source in processor.config.sources.values()]
+        self._handler = _DebouncedHandler(self.sources)
+        self._stop = threading.Event()
+
+    def stop(self) -> None:
+        self._stop.set()
+        with self._handler.condition:
+            self._handler.condition.notify()
+
+    def run(self) -> None:
+        # Catch up on anything that changed while nobody was watching
+        self.processor.sync_knowledge_base()
+
+        observer = Observer()
+        for directory in {directory for directory, _ in self.sources}:
+            observer.schedule(self._handler, str(directory), recursive=False)
+        observer.start()
+        logger.info("Watching %d source directories for changes...", len(self.sources))
+
+        try:
+            while not self._stop.is_set():
+                batch = self._wait_for_batch()
+                if not batch:
+                    continue
+                logger.info("Syncing %d changed files", len(batch))
+                try:
+                    self.processor.sync_files(batch)
+                except Exception:
+                    logger.exception("Incremental knowledge base sync failed")
+        finally:
+            observer.stop()
+            observer.join()
+
+    def _wait_for_batch(self) -> set[Path]:
+        handler = self._handler
+        with handler.condition:
+            while not self._stop.is_set():
+                if not handler.pending:
+                    handler.condition.wait()
+                    continue
+                quiet_for = time.monotonic() - handler.last_event
+                if quiet_for >= self.debounce_seconds:
+                    batch, handler.pending = handler.pending, set()
+                    return batch
+                handler.condition.wait(self.debounce_seconds - quiet_for)
+        return set()
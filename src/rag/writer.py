@@ -0,0 +1,92 @@
+import time
+from collections.abc import Callable
+from typing import TYPE_CHECKING
+
+from utils import get_logger
+
+from .backends import StorageBackend, WriteBatch
+
+
+if TYPE_CHECKING:
+    from .knowledge_base import FileChanges
+
+
+logger = get_logger(__name__)
+
+
+class BulkWriter:
+    """Pack block upserts, deletes and tag edges from many files into backend batches.
+
+    Rows are buffered until ``batch_size`` is reached and then handed to the storage
+    backend as one ``WriteBatch``. Per-file callbacks run only once the batch holding
+    that file has been written.
+    """
+
+    def __init__(self, backend: StorageBackend, batch_size: int) -> None:
+        self.backend = backend
+        self.batch_size = max(1, batch_size)
+
+        self.rows_written = 0
+        self.write_seconds = 0.0
+        self._batch = WriteBatch()
+        self._on_commit: list[Callable[[], None]] = []
+        self._rows = 0
+
+    def delete_file(self, file: str, on_commit: Callable[[], None] | None = None) -> None:
+        """Queue deletion of every block that came from ``file``."""
+        self._batch.replaced_files.append(file)
+        self._queued(1, on_commit)
+
+    def add(self, changes: "FileChanges", on_commit: Callable[[], None] | None = None) -> None:
+        """Queue the block changes of one file."""
+        file = str(changes.path)
+        if changes.replace:
+            self._batch.replaced_files.append(file)
+        self._batch.removed.extend({"source_file": file, "hash": digest} for digest in changes.removed_hashes)
+        self._batch.blocks.extend(
+            {
+                "content": b.content,
+                "embedding": b.embedding,
+                "level": b.level,
+                "hash": b.digest,
+                "tags": b.tags,
+                "source_file": file,
+                "last_modified": changes.entry.mtime,
+                "file_size": changes.entry.size,
+            }
+            for b in changes.added_blocks
+        )
+        rows = int(changes.replace) + len(changes.removed_hashes)
+        rows += sum(1 + len(b.tags) for b in changes.added_blocks)
+        self._queued(rows, on_commit)
+
+    def _queued(self, rows: int, on_commit: Callable[[], None] | None) -> None:
+        self._rows += rows
+        if on_commit is not None:
+            self._on_commit.append(on_commit)
+        if self._rows >= self.batch_size:
+            self.flush()
+
+    def flush(self) -> None:
+        """Write everything buffered so far in one transaction."""
+        if not self._rows and not self._on_commit:
+            return
+
+        batch, rows, callbacks = self._batch, self._rows, self._on_commit
+        self._batch, self._rows, self._on_commit = WriteBatch(), 0, []
+
+        start = time.perf_counter()
+        self.backend.write_batch(batch)
+        self.write_seconds += time.perf_counter() - start
+        self.rows_written += rows
+
+        for callback in callbacks:
+            callback()
+
+    def log_stats(self) -> None:
+        logger.info(
+            "Knowledge base writer: %d rows in %.2fs (%.0f rows/sec)",
+            self.rows_written,
+            self.write_seconds,
+            self.rows_written / self.write_seconds if self.write_seconds else 0.0,
+        )
@@ -0,0 +1,109 @@
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from collections import Counter
+from pathlib import Path
+
+from utils import get_logger
+
+
+logger = get_logger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    key TEXT PRIMARY KEY,
+    response TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    last_used REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS responses_last_used ON responses (last_used);
+"""
+
+
+def request_key(**params: object) -> str:
+    """Content address of a model request: a digest over every parameter that shapes the response."""
+    payload = json.dumps(params, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+    return hashlib.blake2b(payload.encode(), digest_size=20).hexdigest()
+
+
+class ResponseCache:
+    """SQLite cache of model responses, keyed by ``request_key``.
+
+    Entries older than ``ttl_seconds`` are treated as misses and dropped. Once the
+    cache holds more than ``max_entries`` responses, the least recently used ones
+    are evicted.
+    """
+
+    def __init__(self, path: Path, ttl_seconds: float, max_entries: int) -> None:
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.stats: Counter[str] = Counter()
+        self._lock = threading.Lock()
+        self._closed = False
+
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(SCHEMA)
+        with self._conn:
+            self._conn.execute("DELETE FROM responses WHERE created_at < ?", (time.time() - ttl_seconds,))
+
+    def close(self) -> None:
+        """Close the database; later lookups miss and later writes are dropped."""
+        with self._lock:
+            self._closed = True
+            self._conn.close()
+
+    def get(self, key: str) -> str | None:
+        now = time.time()
+        with self._lock:
+            if self._closed:
+                return None
+            row = self._conn.execute("SELECT response, created_at FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.stats["misses"] += 1
+                return None
+            response, created_at = row
+            with self._conn:
+                if created_at < now - self.ttl_seconds:
+                    self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                    self.stats["misses"] += 1
+                    self.stats["expired"] += 1
+                    return None
+                self._conn.execute("UPDATE responses SET last_used = ? WHERE key = ?", (now, key))
+            self.stats["hits"] += 1
+            return response
+
+    def put(self, key: str, response: str) -> None:
+        now = time.time()
+        with self._lock:
+            if self._closed:
+                return
+            with self._conn:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO responses (key, response, created_at, last_used) VALUES (?, ?, ?, ?)",
+                    (key, response, now, now),
+                )
+                evicted = self._conn.execute(
+                    """
+                    DELETE FROM responses WHERE key IN (
+                        SELECT key FROM responses ORDER BY last_used DESC LIMIT -1 OFFSET ?
+                    )
+                    """,
+                    (self.max_entries,),
+                ).rowcount
+                self.stats["evictions"] += evicted
+
+    def log_stats(self) -> None:
+        lookups = self.stats["hits"] + self.stats["misses"]
+        if lookups:
+            logger.info(
+                "Response cache: %d/%d hits (%.0f%%), %d expired, %d evicted",
+                self.stats["hits"],
+                lookups,
+                100 * self.stats["hits"] / lookups,
+                self.stats["expired"],
+                self.stats["evictions"],
+            )
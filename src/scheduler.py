@@ -0,0 +1,138 @@
+import heapq
+import itertools
+import random
+import threading
+import time
+from collections.abc import Callable, Sequence
+from datetime import datetime, time as time_of_day, timedelta
+
+from config import ScheduleConfig
+from outbox import Outbox, OutboxWorker
+from utils import get_logger
+
+
+logger = get_logger(__name__)
+
+
+class TimerHeap:
+    """Callbacks due at given timestamps, kept in a min-heap and run by ``run`` on the calling thread.
+
+    Waiting is a single blocking wait until the earliest entry is due, so an idle
+    heap costs nothing however far ahead its entries are.
+    """
+
+    def __init__(self) -> None:
+        self._heap: list[tuple[float, int, Callable[[], None]]] = []
+        self._order = itertools.count()
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+
+    def __len__(self) -> int:
+        return len(self._heap)
+
+    def at(self, when: float, callback: Callable[[], None]) -> None:
+        """Run ``callback`` once the clock reaches ``when``."""
+        with self._lock:
+            heapq.heappush(self._heap, (when, next(self._order), callback))
+        self._wake.set()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._wake.set()
+
+    def run(self) -> None:
+        """Run callbacks as they come due until ``stop`` is called."""
+        while not self._stop.is_set():
+            self._wake.clear()
+            with self._lock:
+                due = self._heap[0][0] if self._heap else None
+                if due is not None and due <= time.time():
+                    _, _, callback = heapq.heappop(self._heap)
+                else:
+                    callback = None
+            if callback is None:
+                self._wake.wait(None if due is None else due - time.time())
+                continue
+            try:
+                callback()
+            except Exception:
+                logger.exception("Scheduled task failed")
+
+
+def next_slot(slots: Sequence[time_of_day], after: datetime) -> datetime:
+    """Return the first of the daily ``slots`` (local times, sorted) strictly after ``after``."""
+    for days in range(2):
+        day = after.date() + timedelta(days=days)
+        for slot in slots:
+            candidate = datetime.combine(day, slot).astimezone()
+            if candidate > after:
+                return candidate
+    msg = "At least one posting slot is required"
+    raise ValueError(msg)
+
+
+class PostingScheduler:
+    """Publishes queued outbox posts at the configured daily posting slots.
+
+    Each platform gets one heap entry: its next slot, shifted by up to
+    ``jitter_minutes`` either way. When it fires, the oldest due delivery for that
+    platform is sent, unless the platform already reached its daily cap (counted
+    from local midnight), and the following slot is scheduled. Queued posts stay in
+    the outbox until then, so a long queue costs nothing while the daemon waits.
+    Deliveries that failed are retried at later slots once their backoff has passed,
+    and a slot is skipped while the platform's rate limiter has no token left.
+    """
+
+    def __init__(self, outbox: Outbox, worker: OutboxWorker, config: ScheduleConfig) -> None:
+        if not config.slots:
+            msg = "platforms.schedule.slots is empty; add at least one HH:MM posting slot"
+            raise ValueError(msg)
+        self.outbox = outbox
+        self.worker = worker
+        self.config = config
+        self.slots = sorted(time_of_day.fromisoformat(slot) for slot in config.slots)
+        self.timers = TimerHeap()
+
+    def _schedule(self, platform: str, after: datetime) -> None:
+        slot = next_slot(self.slots, after)
+        jitter = random.uniform(-1, 1) * self.config.jitter_minutes * 60  # noqa: S311
+        when = slot.timestamp() + jitter
+        self.timers.at(when, lambda: self._fire(platform, slot))
+        logger.info("Next %s slot: %s", platform, time.strftime("%a %H:%M:%S", time.localtime(when)))
+
+    def _fire(self, platform: str, slot: datetime) -> None:
+        # Chain from the nominal slot, so jitter can never make the same slot fire twice
+        self._schedule(platform, slot)
+
+        cap = self.config.daily_caps.get(platform.lower())
+        midnight = datetime.combine(datetime.now().astimezone().date(), time_of_day()).astimezone().timestamp()
+        if cap is not None and self.outbox.sent_since(platform, midnight) >= cap:
+            logger.info("%s already reached its daily cap of %d posts", platform, cap)
+            return
+
+        now = time.time()
+        if not self.worker.limiters[platform].available(now):
+            # The slot is skipped rather than delayed; the next one tries again
+            self.worker.limiters[platform].mark_blocked(now)
+            logger.info("%s is rate limited, skipping this slot", platform)
+            return
+        deliveries = self.outbox.claim_due([platform], now, limit=1)
+        if not deliveries:
+            logger.info("Nothing queued for %s", platform)
+            return
+        self.worker.send(deliveries)
+
+    def run(self) -> None:
+        """Serve posting slots until interrupted."""
+        now = datetime.now().astimezone()
+        for platform in self.worker.posters:
+            self._schedule(platform, now)
+        logger.info("Posting daemon started for %s", ", ".join(self.worker.posters))
+        try:
+            self.timers.run()
+        finally:
+            self.worker.log_stats()
+
+    def stop(self) -> None:
+        self.timers.stop()
@@ -1,10 +1,20 @@
 from argparse import Namespace
+from collections.abc import Sequence
+from concurrent.futures import ThreadPoolExecutor
+from typing import TYPE_CHECKING
 
-from .bluesky import BlueskyPoster
-from .twitter import TwitterPoster
+from utils import get_logger
 
 
-def initialize_platforms(args: Namespace) -> list[tuple[str, BlueskyPoster | TwitterPoster]]:
+if TYPE_CHECKING:
+    from .bluesky import BlueskyPoster
+    from .twitter import TwitterPoster
+
+
+logger = get_logger(__name__)
+
+
+def initialize_platforms(args: Namespace) -> list[tuple[str, "BlueskyPoster | TwitterPoster"]]:
     """Initialize social media platforms based on command line arguments.
 
     Parameters
@@ -15,14 +25,60 @@ def initialize_platforms(args: Namespace) -> list[tuple[str, BlueskyPoster | Twi
     Returns
     -------
     List[Tuple[str, BlueskyPoster | TwitterPoster]]
-        List of tuples containing platform name and poster instance
+        List of tuples containing platform name and poster instance. Posters log in
+        on their first post, so nothing goes over the network here; ``post_to_platforms``
+        then logs in to every platform concurrently.
     """
+    # tweepy and atproto are only imported for the platforms actually selected
     posters = []
     if args.platform:
         if "twitter" in args.platform:
+            from .twitter import TwitterPoster  # noqa: PLC0415
+
             posters.append(("Twitter", TwitterPoster()))
         if "bluesky" in args.platform:
+            from .bluesky import BlueskyPoster  # noqa: PLC0415
+
             posters.append(("Bluesky", BlueskyPoster()))
     elif args.all:
+        from .bluesky import BlueskyPoster  # noqa: PLC0415
+        from .twitter import TwitterPoster  # noqa: PLC0415
+
         posters.extend([("Twitter", TwitterPoster()), ("Bluesky", BlueskyPoster())])
     return posters
+
+
+def _post_one(platform_name: str, poster: "BlueskyPoster | TwitterPoster", content: str) -> bool:
+    logger.info("Attempting to post to %s...", platform_name)
+    try:
+        if not poster.post_tweet(content):
+            logger.error("Failed to post to %s", platform_name)
+            return False
+    except Exception:
+        logger.exception("Exception while posting to %s", platform_name)
+        return False
+    logger.info("Successfully posted to %s", platform_name)
+    return True
+
+
+def post_to_platforms(posters: Sequence[tuple[str, "BlueskyPoster | TwitterPoster"]], content: str) -> dict[str, bool]:
+    """Post ``content`` to every platform at once.
+
+    Parameters
+    ----------
+    posters : Sequence[tuple[str, BlueskyPoster | TwitterPoster]]
+        Platform names and poster instances, as returned by ``initialize_platforms``.
+    content : str
+        The text to post.
+
+    Returns
+    -------
+    dict[str, bool]
+        Whether the post succeeded, per platform name.
+    """
+    if not posters:
+        return {}
+    # Each post is a blocking HTTP call, so a thread per platform makes the total the slowest platform's time
+    with ThreadPoolExecutor(max_workers=len(posters), thread_name_prefix="post") as executor:
+        futures = {name: executor.submit(_post_one, name, poster, content) for name, poster in posters}
+        return {name: future.result() for name, future in futures.items()}
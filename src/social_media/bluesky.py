@@ -1,35 +1,95 @@
+import json
 import os
+import time
+from functools import cached_property
+from http import HTTPStatus
 
-from atproto import Client
+from atproto import Client, Session, SessionEvent
 
+from config import get_config
 from utils import get_logger
 
+from .rate_limit import BLUESKY_RATE_LIMIT_HEADERS, TokenBucket, parse_rate_limit_headers
+
 
 logger = get_logger(__name__)
 
 
 class BlueskyPoster:
-    """Handler for posting content to Bluesky."""
+    """Handler for posting content to Bluesky.
+
+    The client logs in on first use rather than on construction. Its session is
+    saved under ``app.data_dir`` (readable by the owner only) whenever it is created
+    or refreshed, so later runs resume it instead of logging in with the password
+    again; the password is only used when there is no saved session or it was
+    rejected.
+    """
 
     def __init__(self) -> None:
-        """Initialize Bluesky API client with credentials from environment."""
+        """Read Bluesky credentials from environment; the client itself is created on first use."""
+        config = get_config()
+        limits = config.platforms.rate_limits.bluesky
+        self.rate_limiter = TokenBucket(limits.capacity, limits.period_seconds)
+        self.session_path = config.data_dir / "bluesky_session.json"
+
+        # Load credentials from environment variables
+        self.username = os.getenv("BLUESKY_USERNAME")
+        self.password = os.getenv("BLUESKY_PASSWORD")
+
+        if not self.username or not self.password:
+            msg = "BLUESKY_USERNAME and BLUESKY_PASSWORD are required"
+            raise ValueError(msg)
+
+    @cached_property
+    def client(self) -> Client:
         try:
-            # Load credentials from environment variables
-            self.username = os.getenv("BLUESKY_USERNAME")
-            self.password = os.getenv("BLUESKY_PASSWORD")
-
-            if not self.username or not self.password:
-                raise ValueError("BLUESKY_USERNAME and BLUESKY_PASSWORD are required")
-
-            # Create client and login
-            self.client = Client()
-            self.client.login(self.username, self.password)
-
+            client = self._resume_session()
+            if client is None:
+                client = Client()
+                client.on_session_change(self._save_session)
+                client.login(self.username, self.password)
+                logger.info("Logged in to Bluesky as %s", self.username)
         except Exception:
             logger.exception("Error initializing Bluesky API client")
             raise
         else:
             logger.info("Bluesky API client initialized successfully")
+            return client
+
+    def _resume_session(self) -> Client | None:
+        try:
+            saved = json.loads(self.session_path.read_text(encoding="utf-8"))
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError):
+            logger.warning("Ignoring unreadable Bluesky session file %s", self.session_path)
+            return None
+        if saved.get("username") != self.username:
+            return None
+
+        client = Client()
+        client.on_session_change(self._save_session)
+        try:
+            # Refreshes the access token if it expired; fails once the refresh token has too
+            client.login(session_string=saved["session"])
+        except Exception:
+            logger.warning("Saved Bluesky session was rejected, logging in again", exc_info=True)
+            return None
+        logger.info("Resumed saved Bluesky session for %s", self.username)
+        return client
+
+    def _save_session(self, event: SessionEvent, session: Session) -> None:
+        if event not in (SessionEvent.CREATE, SessionEvent.REFRESH):
+            return
+        payload = json.dumps({"username": self.username, "session": session.export()})
+        self.session_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.session_path.with_suffix(self.session_path.suffix + ".tmp")
+        # Created owner-only from the start: the session string grants full account access
+        fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        tmp_path.chmod(0o600)  # In case a stale temp file was left with other permissions
+        with os.fdopen(fd, "w", encoding="utf-8") as file:
+            file.write(payload)
+        tmp_path.replace(self.session_path)
 
     def post_tweet(self, content: str, image_path: str | None = None) -> bool:
         """Post to Bluesky, optionally with an image."""
@@ -49,5 +109,12 @@ class BlueskyPoster:
             return True
 
         except Exception as e:
+            # atproto request errors carry the HTTP response, including the rate limit headers
+            response = getattr(e, "response", None)
+            if getattr(response, "status_code", None) == HTTPStatus.TOO_MANY_REQUESTS:
+                _, reset_at = parse_rate_limit_headers(response.headers or {}, BLUESKY_RATE_LIMIT_HEADERS)
+                resume_at = self.rate_limiter.throttle(reset_at)
+                logger.warning("Bluesky rate limit reached; posting paused for %.0fs", resume_at - time.time())
+                return False
             logger.exception("Error posting to Bluesky: %s", str(e))
             return False
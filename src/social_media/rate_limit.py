@@ -0,0 +1,105 @@
+import threading
+import time
+from collections.abc import Mapping, Sequence
+
+
+# Header prefixes carrying "<prefix>-remaining" and "<prefix>-reset" (epoch seconds) on each platform
+TWITTER_RATE_LIMIT_HEADERS = ("x-rate-limit", "x-user-limit-24hour", "x-app-limit-24hour")
+BLUESKY_RATE_LIMIT_HEADERS = ("ratelimit",)
+
+
+def parse_rate_limit_headers(headers: Mapping[str, str], prefixes: Sequence[str]) -> tuple[int | None, float | None]:
+    """Return ``(remaining, reset_at)`` for the most restrictive limit reported under ``prefixes``.
+
+    Both are None when the response carries none of the headers.
+    """
+    remaining: int | None = None
+    reset_at: float | None = None
+    for prefix in prefixes:
+        try:
+            prefix_remaining = int(headers[f"{prefix}-remaining"])
+            prefix_reset = float(headers[f"{prefix}-reset"])
+        except (KeyError, TypeError, ValueError):
+            continue
+        if remaining is None or prefix_remaining < remaining:
+            remaining, reset_at = prefix_remaining, prefix_reset
+    return remaining, reset_at
+
+
+class TokenBucket:
+    """Client-side rate limit for one platform: ``capacity`` posts per ``period_seconds``.
+
+    Tokens refill continuously. The bucket is reconciled with what the platform
+    reports: ``update`` takes the remaining quota from response headers, and
+    ``throttle`` records a rejected (HTTP 429) request, blocking the bucket until the
+    reported reset time. ``blocked_seconds`` adds up how long sends were held back
+    while waiting for a token.
+    """
+
+    def __init__(self, capacity: int, period_seconds: float) -> None:
+        self.capacity = capacity
+        self.rate = capacity / period_seconds
+        self.tokens = float(capacity)
+        self.blocked_until = 0.0
+        self.blocked_seconds = 0.0
+        self.throttled = 0
+        self._updated = time.time()
+        self._blocked_since: float | None = None
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float) -> None:
+        self.tokens = min(float(self.capacity), self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def available(self, now: float | None = None) -> int:
+        """How many sends may go out right now."""
+        now = time.time() if now is None else now
+        with self._lock:
+            self._refill(now)
+            return 0 if now < self.blocked_until else max(0, int(self.tokens))
+
+    def next_token_at(self, now: float | None = None) -> float:
+        """When the next send may go out."""
+        now = time.time() if now is None else now
+        with self._lock:
+            self._refill(now)
+            at = now if self.tokens >= 1 else now + (1 - self.tokens) / self.rate
+            return max(at, self.blocked_until)
+
+    def mark_blocked(self, now: float | None = None) -> None:
+        """Note that a send is waiting for a token; the wait ends at the next ``take``."""
+        with self._lock:
+            if self._blocked_since is None:
+                self._blocked_since = time.time() if now is None else now
+
+    def take(self, now: float | None = None) -> None:
+        """Spend a token on a send."""
+        now = time.time() if now is None else now
+        with self._lock:
+            self._refill(now)
+            self.tokens -= 1
+            if self._blocked_since is not None:
+                self.blocked_seconds += now - self._blocked_since
+                self._blocked_since = None
+
+    def update(self, remaining: int | None, reset_at: float | None) -> None:
+        """Reconcile with the quota the platform reported in its rate limit headers."""
+        if remaining is None:
+            return
+        with self._lock:
+            self._refill(time.time())
+            self.tokens = min(self.tokens, float(remaining))
+            if remaining == 0 and reset_at is not None:
+                self.blocked_until = max(self.blocked_until, reset_at)
+
+    def throttle(self, reset_at: float | None) -> float:
+        """Record a request the platform rejected for its rate limit; return when sending may resume."""
+        now = time.time()
+        with self._lock:
+            self._refill(now)
+            self.throttled += 1
+            if self._blocked_since is None:
+                self._blocked_since = now
+            self.tokens = min(self.tokens, 0.0)
+            self.blocked_until = max(self.blocked_until, reset_at if reset_at is not None else now + 1 / self.rate)
+            return self.blocked_until
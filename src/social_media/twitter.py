@@ -1,48 +1,66 @@
 import os
+import time
+from functools import cached_property
 from pathlib import Path
 from typing import Any
 
+import requests
 import tweepy
 
+from config import get_config
 from utils import get_logger
 
+from .rate_limit import TWITTER_RATE_LIMIT_HEADERS, TokenBucket, parse_rate_limit_headers
+
 
 logger = get_logger(__name__)
 
 
 class TwitterPoster:
-    """Handler for posting content to Twitter."""
+    """Handler for posting content to Twitter.
+
+    The API clients are created on first use. Responses are returned raw
+    (``requests.Response``) so their rate limit headers can keep ``rate_limiter`` in
+    step with the quota Twitter reports.
+    """
 
     def __init__(self) -> None:
-        """Initialize Twitter API client with credentials from environment."""
+        """Read Twitter credentials from environment; the API clients are created on first use."""
+        limits = get_config().platforms.rate_limits.twitter
+        self.rate_limiter = TokenBucket(limits.capacity, limits.period_seconds)
+
+        # Load credentials from environment variables
+        self.access_key = os.getenv("TWITTER_ACCESS_TOKEN")
+        self.access_secret = os.getenv("TWITTER_ACCESS_TOKEN_SECRET")
+        self.consumer_key = os.getenv("TWITTER_API_KEY")
+        self.consumer_secret = os.getenv("TWITTER_API_SECRET")
+        self.bearer_token = os.getenv("TWITTER_BEARER_TOKEN")
+
+    @cached_property
+    def api(self) -> tweepy.API:
+        """API object for v1.1 endpoints (media upload)."""
+        auth = tweepy.OAuthHandler(self.consumer_key, self.consumer_secret)
+        auth.set_access_token(self.access_key, self.access_secret)
+        return tweepy.API(auth)
+
+    @cached_property
+    def client(self) -> tweepy.Client:
+        """Client object for v2 endpoints."""
         try:
-            # Load credentials from environment variables
-            access_key = os.getenv("TWITTER_ACCESS_TOKEN")
-            access_secret = os.getenv("TWITTER_ACCESS_TOKEN_SECRET")
-            consumer_key = os.getenv("TWITTER_API_KEY")
-            consumer_secret = os.getenv("TWITTER_API_SECRET")
-            bearer_token = os.getenv("TWITTER_BEARER_TOKEN")
-
-            # Authenticate to Twitter
-            auth = tweepy.OAuthHandler(consumer_key, consumer_secret)
-            auth.set_access_token(access_key, access_secret)
-
-            # Create API object for v1.1 endpoints
-            self.api = tweepy.API(auth)
-
-            # Create Client object for v2 endpoints
-            self.client = tweepy.Client(
-                bearer_token=bearer_token,
-                access_token=access_key,
-                access_token_secret=access_secret,
-                consumer_key=consumer_key,
-                consumer_secret=consumer_secret,
+            client = tweepy.Client(
+                bearer_token=self.bearer_token,
+                access_token=self.access_key,
+                access_token_secret=self.access_secret,
+                consumer_key=self.consumer_key,
+                consumer_secret=self.consumer_secret,
+                return_type=requests.Response,
             )
         except Exception:
             logger.exception("Error initializing Twitter API client")
             raise
         else:
             logger.info("Twitter API client initialized successfully")
+            return client
 
     def post_tweet(self, content: str, image_path: str | None = None) -> bool:
         """Post a tweet, optionally with an image.
@@ -66,13 +84,19 @@ class TwitterPoster:
                 media_ids = [media.media_id]
 
             response = self.client.create_tweet(text=content, media_ids=media_ids)
+        except tweepy.errors.TooManyRequests as exc:
+            _, reset_at = parse_rate_limit_headers(exc.response.headers, TWITTER_RATE_LIMIT_HEADERS)
+            resume_at = self.rate_limiter.throttle(reset_at)
+            logger.warning("Twitter rate limit reached; posting paused for %.0fs", resume_at - time.time())
+            return False
         except tweepy.errors.TweepyException as exc:
             logger.exception("Error posting tweet")
             if hasattr(exc, "api_errors"):
                 logger.exception("API error details: %s", exc.api_errors)
             return False
         else:
-            logger.info("Tweet posted successfully. Tweet ID: %s", response.data["id"])
+            self.rate_limiter.update(*parse_rate_limit_headers(response.headers, TWITTER_RATE_LIMIT_HEADERS))
+            logger.info("Tweet posted successfully. Tweet ID: %s", response.json()["data"]["id"])
             return True
 
     def get_user_info(self) -> dict[str, Any] | None:
@@ -85,12 +109,12 @@ class TwitterPoster:
         """
         try:
             response = self.client.get_me(user_fields=["id", "name", "username"])
-            user = response.data
+            user = response.json()["data"]
         except tweepy.errors.TweepyException as exc:
             logger.exception("Error retrieving user info")
             if hasattr(exc, "api_errors"):
                 logger.exception("API error details: %s", exc.api_errors)
             return None
         else:
-            logger.info("Retrieved user info for: @%s", user.username)
+            logger.info("Retrieved user info for: @%s", user["username"])
             return user
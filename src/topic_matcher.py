@@ -0,0 +1,83 @@
+import re
+from collections import Counter
+from collections.abc import Iterable
+from dataclasses import dataclass, field
+
+from utils import get_logger
+
+
+logger = get_logger(__name__)
+
+
+@dataclass
+class TopicHits:
+    """Per-topic occurrence counts found in one text."""
+
+    include: dict[str, int] = field(default_factory=dict)
+    avoid: dict[str, int] = field(default_factory=dict)
+
+    @property
+    def score(self) -> int:
+        """Total number of occurrences of included topics."""
+        return sum(self.include.values())
+
+    @property
+    def on_topic(self) -> bool:
+        """Whether the text mentions an included topic and no avoided one."""
+        return bool(self.include) and not self.avoid
+
+
+class TopicMatcher:
+    """Finds every include and avoid topic in a text with a single regex scan.
+
+    All topics are compiled into one alternation that must not touch a word character on
+    either side, so "API" matches "the API" but not "rapid". Multi-word topics match
+    across any run of whitespace. Longer topics are tried first, so "Machine Learning"
+    wins over a shorter topic that is a prefix of it. Text is lowercased once up front,
+    which is several times faster than a case-insensitive pattern.
+    """
+
+    def __init__(self, include: Iterable[str], avoid: Iterable[str]) -> None:
+        self.include = tuple(include)
+        self.avoid = tuple(avoid)
+
+        # Normalised topic text -> (is_avoided, topic as configured)
+        self._topics: dict[str, tuple[bool, str]] = {}
+        for avoided, topics in ((False, self.include), (True, self.avoid)):
+            for topic in topics:
+                key = self._normalize(topic)
+                if key in self._topics and self._topics[key][0] != avoided:
+                    logger.warning("Topic %r is both included and avoided; treating it as avoided", topic)
+                if key:
+                    self._topics[key] = (avoided, topic)
+
+        alternatives = [
+            r"\s+".join(re.escape(word) for word in key.split())
+            for key in sorted(self._topics, key=len, reverse=True)
+        ]
+        if alternatives:
+            # The lookahead rejects most positions on their first character before trying every alternative
+            first_chars = re.escape("".join(sorted({key[0] for key in self._topics})))
+            self._pattern = re.compile(rf"(?<!\w)(?=[{first_chars}])(?:{'|'.join(alternatives)})(?!\w)")
+        else:
+            self._pattern = re.compile(r"(?!)")
+
+    @staticmethod
+    def _normalize(text: str) -> str:
+        return " ".join(text.lower().split())
+
+    @property
+    def fingerprint(self) -> str:
+        """Stable description of the configured topics, for invalidating results derived from them."""
+        include = sorted(self._normalize(topic) for topic in self.include)
+        avoid = sorted(self._normalize(topic) for topic in self.avoid)
+        return repr((include, avoid))
+
+    def match(self, text: str) -> TopicHits:
+        """Count the occurrences of each topic in ``text``."""
+        counts = Counter(self._normalize(m.group()) for m in self._pattern.finditer(text.lower()))
+        hits = TopicHits()
+        for key, count in counts.items():
+            avoided, topic = self._topics[key]
+            (hits.avoid if avoided else hits.include)[topic] = count
+        return hits
@@ -101,5 +101,15 @@ def parse_args() -> argparse.Namespace:
         action="store_true",
         help="Synchronize knowledge base with notes (initialize if needed)",
     )
+    parser.add_argument(
+        "--watch-kb",
+        action="store_true",
+        help="Keep the knowledge base in sync by watching the note sources for changes",
+    )
+    parser.add_argument(
+        "--daemon",
+        action="store_true",
+        help="Keep running and publish queued posts at the posting slots in config.yaml (platforms.schedule)",
+    )
 
     return parser.parse_args()
@@ -0,0 +1,161 @@
+import hashlib
+import os
+import re
+from collections.abc import Iterator
+from pathlib import Path
+
+import numpy as np
+import pytest
+import yaml
+
+import config
+from rag.knowledge_base import KnowledgeBaseProcessor
+from rag.retriever import KnowledgeRetriever
+
+
+DIMENSION = 256
+
+VAULT = {
+    "a.md": """\
+- Python decorators wrap functions #python
+- Python generators yield values lazily #python
+- Bread baking needs patience #cooking
+- TODO
+""",
+    "b.md": """\
+- Decorators in Python wrap functions #python
+- Sourdough bread baking takes patience #cooking
+- TODO
+""",
+}
+
+
+class BagOfWordsModel:
+    """Deterministic stand-in for the sentence-transformer: hashed word counts, so shared words mean similarity."""
+
+    def encode(self, texts: str | list[str], *_args: object, **_kwargs: object) -> np.ndarray:
+        if isinstance(texts, str):
+            return self.encode([texts])[0]
+        vectors = np.zeros((len(texts), DIMENSION), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for word in re.findall(r"\w+", text.lower()):
+                vectors[row, int(hashlib.md5(word.encode()).hexdigest(), 16) % DIMENSION] += 1  # noqa: S324
+        return vectors
+
+
+# Never the configured server: the tests write and delete blocks
+NEO4J = pytest.param(
+    "neo4j",
+    marks=pytest.mark.skipif(
+        not os.getenv("NEO4J_TEST_URI"),
+        reason="set NEO4J_TEST_URI to a disposable Neo4j server to run",
+    ),
+)
+
+
+@pytest.fixture(params=["sqlite", NEO4J])
+def processor(
+    request: pytest.FixtureRequest,
+    tmp_path: Path,
+    monkeypatch: pytest.MonkeyPatch,
+) -> Iterator[KnowledgeBaseProcessor]:
+    vault = tmp_path / "vault"
+    vault.mkdir()
+    for name, text in VAULT.items():
+        (vault / name).write_text(text, encoding="utf-8")
+
+    raw = yaml.safe_load(config.CONFIG_PATH.read_text(encoding="utf-8"))
+    raw["app"]["data_dir"] = str(tmp_path / "data")
+    raw["sources"] = {"vault": {"path": str(vault), "pattern": "*.md"}}
+    kb = raw["knowledge_base"]
+    kb["embedding"].update(dimension=DIMENSION, workers=0, cache={"enabled": False})
+    kb["processing"]["show_progress"] = False
+    kb["database"]["type"] = request.param
+    if request.param == "neo4j":
+        pytest.importorskip("neo4j")
+        kb["database"].update(
+            uri=os.environ["NEO4J_TEST_URI"],
+            user=os.getenv("NEO4J_TEST_USER", "neo4j"),
+            password=os.getenv("NEO4J_TEST_PASSWORD", ""),
+        )
+    monkeypatch.setattr(config, "_config", config.parse_config(raw))
+
+    model = BagOfWordsModel()
+    monkeypatch.setattr(KnowledgeBaseProcessor, "_encode", lambda _self, texts, _pbar=None: list(model.encode(texts)))
+    kb_processor = KnowledgeBaseProcessor()
+    if request.param == "neo4j":
+        try:
+            kb_processor.backend.driver.verify_connectivity()
+        except Exception as e:  # noqa: BLE001
+            kb_processor.close()
+            pytest.skip(f"Neo4j server not reachable: {e}")
+
+    kb_processor.sync_knowledge_base()
+    _await_indexes(kb_processor)
+    yield kb_processor
+
+    if request.param == "neo4j":
+        with kb_processor.backend.driver.session() as session:
+            session.run("MATCH (b:Block) WHERE b.source_file STARTS WITH $vault DETACH DELETE b", vault=str(vault))
+    kb_processor.close()
+
+
+def _await_indexes(kb_processor: KnowledgeBaseProcessor) -> None:
+    if kb_processor.kb_config.database.type == "neo4j":
+        with kb_processor.backend.driver.session() as session:
+            session.run("CALL db.awaitIndexes()")
+
+
+@pytest.fixture
+def retriever(processor: KnowledgeBaseProcessor) -> KnowledgeRetriever:
+    return KnowledgeRetriever(processor.backend, model=BagOfWordsModel())
+
+
+def test_search_ranks_closest_block_first(retriever: KnowledgeRetriever) -> None:
+    results = retriever.find_similar_content("python decorators wrap functions", limit=2)
+
+    assert results[0]["content"] == "Python decorators wrap functions #python"
+    assert results[1]["content"] == "Decorators in Python wrap functions #python"
+    assert results[0]["score"] >= results[1]["score"]
+
+
+def test_search_filters_by_tag(retriever: KnowledgeRetriever) -> None:
+    results = retriever.semantic_search("python bread baking", with_tags=["cooking"], limit=5)
+
+    assert {result["content"] for result in results} == {
+        "Bread baking needs patience #cooking",
+        "Sourdough bread baking takes patience #cooking",
+    }
+    assert all("cooking" in result["tags"] for result in results)
+
+
+def test_related_concepts_follow_similar_edges(retriever: KnowledgeRetriever) -> None:
+    related = {result["content"] for result in retriever.find_related_concepts("python")}
+
+    assert "Python decorators wrap functions #python" in related
+    assert "Decorators in Python wrap functions #python" in related
+    assert not any("bread" in content.lower() for content in related)
+
+
+def test_explore_reaches_similar_block_in_one_hop(retriever: KnowledgeRetriever) -> None:
+    results = {
+        result["content"]: result
+        for result in retriever.explore_knowledge_graph("Python decorators wrap functions #python", max_depth=2)
+    }
+
+    assert results["Decorators in Python wrap functions #python"]["distance"] == 1
+    assert results["Decorators in Python wrap functions #python"]["connection_types"] == ["SIMILAR"]
+    assert results["Python generators yield values lazily #python"]["distance"] == 2
+    assert "Python decorators wrap functions #python" not in results
+
+
+def test_shared_block_survives_removal_from_one_file(
+    processor: KnowledgeBaseProcessor,
+    retriever: KnowledgeRetriever,
+) -> None:
+    vault = processor.config.sources["vault"].path
+    (vault / "a.md").write_text(VAULT["a.md"].replace("- TODO\n", ""), encoding="utf-8")
+    processor.sync_knowledge_base()
+    _await_indexes(processor)
+
+    assert [result["content"] for result in retriever.find_similar_content("TODO", limit=1)] == ["TODO"]
@@ -0,0 +1,41 @@
+import json
+import subprocess
+import sys
+from pathlib import Path
+
+
+SRC = Path(__file__).parent.parent / "src"
+
+# The generate-and-post path must not pay for these at startup
+HEAVY_MODULES = ("litellm", "tweepy", "atproto", "torch", "sentence_transformers", "neo4j")
+IMPORT_BUDGET_SECONDS = 0.5
+
+PROBE = f"""
+import json, sys, time
+start = time.perf_counter()
+import main
+elapsed = time.perf_counter() - start
+print(json.dumps({{"seconds": elapsed, "loaded": [m for m in {HEAVY_MODULES!r} if m in sys.modules]}}))
+"""
+
+
+def _import_main() -> dict:
+    # A fresh interpreter, so nothing imported by other tests counts
+    result = subprocess.run(  # noqa: S603
+        [sys.executable, "-c", PROBE],
+        cwd=SRC,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return json.loads(result.stdout.splitlines()[-1])
+
+
+def test_main_imports_no_heavy_dependencies() -> None:
+    assert _import_main()["loaded"] == []
+
+
+def test_main_imports_within_budget() -> None:
+    # Best of a few runs, so one slow filesystem access does not fail the test
+    seconds = min(_import_main()["seconds"] for _ in range(3))
+    assert seconds < IMPORT_BUDGET_SECONDS, f"import main took {seconds:.3f}s"
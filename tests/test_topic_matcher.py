@@ -0,0 +1,51 @@
+import random
+import re
+
+from config import get_config
+from topic_matcher import TopicMatcher
+
+
+def test_topics_match_on_word_boundaries_only() -> None:
+    matcher = TopicMatcher(["API"], [])
+
+    assert matcher.match("Designing the API, then a rapid prototype").include == {"API": 1}
+    assert matcher.match("rapid apis").include == {}
+
+
+def test_multi_word_topics_match_across_whitespace_and_win_over_prefixes() -> None:
+    matcher = TopicMatcher(["Machine", "Machine Learning"], [])
+
+    assert matcher.match("machine\n  learning, then a machine").include == {"Machine Learning": 1, "Machine": 1}
+
+
+def test_avoided_topics_are_reported_separately() -> None:
+    matcher = TopicMatcher(["Python"], ["Politics"])
+    hits = matcher.match("Python and politics")
+
+    assert hits.include == {"Python": 1}
+    assert hits.avoid == {"Politics": 1}
+    assert not hits.on_topic
+
+
+def test_single_pass_agrees_with_one_regex_per_topic() -> None:
+    topics = get_config().content.topics
+    matcher = TopicMatcher(topics.include, topics.avoid)
+    keywords = sorted({topic.lower() for topic in (*topics.include, *topics.avoid)}, key=len, reverse=True)
+    per_topic = {keyword: re.compile(rf"(?<!\w){re.escape(keyword)}(?!\w)") for keyword in keywords}
+
+    rng = random.Random(0)  # noqa: S311
+    filler = ["the", "of", "and", "note", "today", "meeting", "idea", "read", "write", "build", "project"]
+    vocabulary = filler * 5 + [word for keyword in keywords for word in keyword.split()]
+    for _ in range(200):
+        note = " ".join(rng.choices(vocabulary, k=rng.randint(20, 200)))
+        hits = matcher.match(note)
+        found = {topic.lower(): count for topic, count in (*hits.include.items(), *hits.avoid.items())}
+        # Longest first, and a matched span is not counted again for a shorter topic inside it
+        expected = {}
+        remaining = note
+        for keyword, pattern in per_topic.items():
+            count = len(pattern.findall(remaining))
+            if count:
+                expected[keyword] = count
+                remaining = pattern.sub("|", remaining)
+        assert found == expected